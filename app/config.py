@@ -0,0 +1,44 @@
+from typing import Optional
+
+from pydantic import Field, field_validator
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+from .utils.order_code import check_booth_id
+
+
+class Settings(BaseSettings):
+    """Server settings, read from environment variables (e.g. BOOTH_ID=A)."""
+
+    model_config = SettingsConfigDict(env_ignore_empty=True)
+
+    database_url: str = "sqlite:///./database.db"
+
+    # Per-client rate limits (see app/utils/admission.py) key on the client
+    # address. Behind a reverse proxy set CLIENT_IP_HEADER (e.g. X-Forwarded-For)
+    # and TRUSTED_PROXIES to the proxy address(es), comma-separated ('*' = any)
+    client_ip_header: Optional[str] = None
+    trusted_proxies: str = "127.0.0.1"
+
+    # Multi-booth sync: a booth with BOOTH_ID set records a change log of its
+    # order/menu mutations and, if AGGREGATOR_URL is set, ships it there
+    booth_id: Optional[str] = Field(None, pattern=r"^[A-Za-z0-9]{1,10}$")
+    aggregator_url: Optional[str] = None
+    sync_interval_seconds: float = 5.0
+    sync_batch_size: int = 500
+
+    # Online snapshot backups (see app/utils/backup.py); interval 0 disables the schedule
+    backup_dir: str = "backups"
+    backup_interval_minutes: float = Field(30.0, ge=0)
+    backup_retention: int = Field(10, ge=1)
+
+    # Polled read routes share in-flight loads and reuse the result this long
+    # (see app/utils/read_cache.py); 0 keeps only the sharing
+    read_cache_ttl_seconds: float = Field(1.0, ge=0)
+
+    @field_validator("booth_id")
+    @classmethod
+    def check_booth_id(cls, value: Optional[str]) -> Optional[str]:
+        return value if value is None else check_booth_id(value)
+
+
+settings = Settings()
@@ -1,13 +1,27 @@
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine, event, text
 from sqlalchemy.orm import sessionmaker, declarative_base
 
-DATABASE_URL = "sqlite:///./database.db"
+from .config import settings
+from .utils.profiling import ProfilingConnection, install_query_hooks
 
-# For SQLite, check_same_thread must be False when used with FastAPI / multi-threaded environments
+DATABASE_URL = settings.database_url
+
+# For SQLite, check_same_thread must be False when used with FastAPI / multi-threaded environments.
+# ProfilingConnection counts fetched rows for request profiles (see app/utils/profiling.py).
 engine = create_engine(
     DATABASE_URL,
-    connect_args={"check_same_thread": False},
+    connect_args={"check_same_thread": False, "factory": ProfilingConnection},
 )
+install_query_hooks(engine)
+
+
+@event.listens_for(engine, "connect")
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """Use WAL so long report/stats reads don't block order writes (and vice versa)."""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.close()
+
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -31,9 +45,108 @@ def ensure_preorder_column():
     with engine.begin() as conn:
         result = conn.execute(text("PRAGMA table_info('orders')"))
         columns = {row[1] for row in result}  # row[1] is the column name
+        if not columns:
+            # Fresh database: create_all() will create the table with the column
+            return
         if "preorder" not in columns:
             conn.execute(text("ALTER TABLE orders ADD COLUMN preorder BOOLEAN NOT NULL DEFAULT 0"))
             # Backfill safeguard for any NULLs (defensive; shouldn't be needed)
             conn.execute(text("UPDATE orders SET preorder = 0 WHERE preorder IS NULL"))
         # Create index if it doesn't exist
         conn.execute(text("CREATE INDEX IF NOT EXISTS ix_orders_preorder ON orders (preorder)"))
+
+
+def ensure_money_in_cents():
+    """Ensure money columns store integer cents (SQLite).
+    Converts the old DECIMAL(10,2) columns (stored by SQLite as floating point)
+    in place: multiplies by 100, rounds to integers and renames each column to
+    '<name>_cents'. The declared NUMERIC type is kept; its affinity stores the
+    converted values as INTEGER. Columns that are already renamed are skipped,
+    so this is safe to call multiple times; skipped entirely for a fresh database.
+    """
+    money_columns = {
+        "menu_items": ("unit_price",),
+        "orders": ("total_price",),
+        "order_items": ("unit_price", "line_total"),
+    }
+    with engine.begin() as conn:
+        for table, names in money_columns.items():
+            result = conn.execute(text(f"PRAGMA table_info('{table}')"))
+            columns = {row[1] for row in result}
+            for name in names:
+                if name not in columns:
+                    continue
+                # UPDATE first: it opens the transaction (pysqlite doesn't for DDL),
+                # so conversion and rename commit or roll back together
+                conn.execute(text(f"UPDATE {table} SET {name} = CAST(ROUND({name} * 100) AS INTEGER)"))
+                conn.execute(text(f"ALTER TABLE {table} RENAME COLUMN {name} TO {name}_cents"))
+
+
+def ensure_order_search_index():
+    """Ensure the 'orders_fts' FTS5 index over customer and item names exists (SQLite).
+    One FTS row per order (rowid = orders.id) holding the customer name and the
+    space-joined item names; triggers on 'orders' and 'order_items' keep it in sync.
+    Backfills (and optimizes) from existing data when the table is first created.
+    Must run after the tables exist. Safe to call multiple times.
+    """
+    refresh_row = (
+        "DELETE FROM orders_fts WHERE rowid = {id};"
+        " INSERT INTO orders_fts (rowid, customer_name, item_names)"
+        " SELECT o.id, COALESCE(o.customer_name, ''),"
+        " COALESCE((SELECT group_concat(oi.item_name, ' ') FROM order_items oi WHERE oi.order_id = o.id), '')"
+        " FROM orders o WHERE o.id = {id};"
+    )
+    triggers = {
+        "orders_fts_orders_ai": f"AFTER INSERT ON orders BEGIN {refresh_row.format(id='new.id')} END",
+        "orders_fts_orders_au": (
+            f"AFTER UPDATE OF customer_name ON orders BEGIN {refresh_row.format(id='new.id')} END"
+        ),
+        "orders_fts_orders_ad": "AFTER DELETE ON orders BEGIN DELETE FROM orders_fts WHERE rowid = old.id; END",
+        "orders_fts_items_ai": f"AFTER INSERT ON order_items BEGIN {refresh_row.format(id='new.order_id')} END",
+        "orders_fts_items_au": (
+            "AFTER UPDATE OF item_name, order_id ON order_items BEGIN "
+            f"{refresh_row.format(id='old.order_id')} {refresh_row.format(id='new.order_id')} END"
+        ),
+        "orders_fts_items_ad": f"AFTER DELETE ON order_items BEGIN {refresh_row.format(id='old.order_id')} END",
+    }
+
+    with engine.begin() as conn:
+        exists = conn.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'orders_fts'")
+        ).first()
+        if exists is None:
+            # unicode61 keeps CJK names as whole tokens; prefix indexes speed up short prefix queries
+            conn.execute(
+                text(
+                    "CREATE VIRTUAL TABLE orders_fts USING fts5("
+                    "customer_name, item_names, tokenize = 'unicode61', prefix = '1 2 3')"
+                )
+            )
+            conn.execute(
+                text(
+                    "INSERT INTO orders_fts (rowid, customer_name, item_names)"
+                    " SELECT o.id, COALESCE(o.customer_name, ''),"
+                    " COALESCE((SELECT group_concat(oi.item_name, ' ') FROM order_items oi WHERE oi.order_id = o.id), '')"
+                    " FROM orders o"
+                )
+            )
+            # The backfill leaves many index segments; merge them now rather than
+            # in whichever order write later triggers the merge
+            conn.execute(text("INSERT INTO orders_fts (orders_fts) VALUES ('optimize')"))
+        for name, body in triggers.items():
+            conn.execute(text(f"CREATE TRIGGER IF NOT EXISTS {name} {body}"))
+
+
+def ensure_menu_source_key_column():
+    """Ensure the 'source_key' column exists on 'menu_items' table (SQLite).
+    Used by the sync aggregator to map menu items merged from booths.
+    Adds a nullable column and a unique index if missing. Safe to call multiple times.
+    """
+    with engine.begin() as conn:
+        result = conn.execute(text("PRAGMA table_info('menu_items')"))
+        columns = {row[1] for row in result}
+        if "source_key" not in columns:
+            conn.execute(text("ALTER TABLE menu_items ADD COLUMN source_key VARCHAR(64)"))
+        conn.execute(
+            text("CREATE UNIQUE INDEX IF NOT EXISTS ix_menu_items_source_key ON menu_items (source_key)")
+        )
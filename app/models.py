@@ -7,8 +7,8 @@ from sqlalchemy import (
     DateTime,
     ForeignKey,
     Integer,
-    Numeric,
     String,
+    Text,
 )
 from sqlalchemy.orm import relationship
 
@@ -27,9 +27,16 @@ class MenuItem(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(255), nullable=False)
-    unit_price = Column(Numeric(10, 2), nullable=False)
+    unit_price_cents = Column(Integer, nullable=False)
     photo_path = Column(String(512), nullable=True)
     is_active = Column(Boolean, default=True, nullable=False)
+    source_key = Column(
+        String(64),
+        unique=True,
+        index=True,
+        nullable=True,
+        comment="'<booth_id>:<menu id>' for items merged from a booth by the sync aggregator",
+    )
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(
         DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False
@@ -46,7 +53,7 @@ class Order(Base):
     customer_name = Column(String(255), nullable=True)
     status = Column(String(20), default=OrderStatus.NEW.value, index=True)
     preorder = Column(Boolean, default=False, nullable=False, index=True)
-    total_price = Column(Numeric(10, 2), nullable=False, default=0)
+    total_price_cents = Column(Integer, nullable=False, default=0)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(
         DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False
@@ -68,9 +75,31 @@ class OrderItem(Base):
         comment="Nullable to keep snapshot even if menu item deleted",
     )
     item_name = Column(String(255), nullable=False)
-    unit_price = Column(Numeric(10, 2), nullable=False)
+    unit_price_cents = Column(Integer, nullable=False)
     quantity = Column(Integer, nullable=False)
-    line_total = Column(Numeric(10, 2), nullable=False)
+    line_total_cents = Column(Integer, nullable=False)
 
     order = relationship("Order", back_populates="items")
     menu_item = relationship("MenuItem", back_populates="order_items")
+
+
+class ChangeLog(Base):
+    """Append-only log of order/menu mutations recorded by a booth, shipped to the aggregator."""
+
+    __tablename__ = "change_log"
+
+    id = Column(Integer, primary_key=True, comment="Sequence number, increasing per booth")
+    entity = Column(String(20), nullable=False)
+    op = Column(String(20), nullable=False)
+    entity_key = Column(String(100), nullable=True)
+    payload = Column(Text, nullable=True, comment="JSON snapshot of the entity after the mutation")
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class SyncCursor(Base):
+    """Sync high-water marks: 'shipped' on a booth, 'booth:<id>' per booth on the aggregator."""
+
+    __tablename__ = "sync_cursors"
+
+    name = Column(String(64), primary_key=True)
+    last_seq = Column(Integer, nullable=False, default=0)
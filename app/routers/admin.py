@@ -0,0 +1,91 @@
+from typing import List
+
+from fastapi import APIRouter, HTTPException, status
+
+from ..schemas import (
+    BackupStatus,
+    Message,
+    ProfilingSettings,
+    ProfilingSettingsUpdate,
+    ReadCacheStats,
+    RequestProfileOut,
+    RequestProfileSummary,
+    SlowQueryOut,
+)
+from ..utils.backup import backup_manager
+from ..utils.profiling import profiler
+from ..utils.read_cache import read_cache
+
+router = APIRouter()
+
+
+@router.get("/admin/profiling", response_model=ProfilingSettings)
+async def get_profiling_settings():
+    return ProfilingSettings(enabled=profiler.enabled, slow_query_threshold_ms=profiler.slow_query_threshold_ms)
+
+
+@router.put("/admin/profiling", response_model=ProfilingSettings)
+async def update_profiling_settings(payload: ProfilingSettingsUpdate):
+    """Toggle profiling of all requests and/or change the slow-query threshold."""
+    if payload.enabled is not None:
+        profiler.enabled = payload.enabled
+    if payload.slow_query_threshold_ms is not None:
+        profiler.slow_query_threshold_ms = payload.slow_query_threshold_ms
+    return ProfilingSettings(enabled=profiler.enabled, slow_query_threshold_ms=profiler.slow_query_threshold_ms)
+
+
+@router.get("/admin/profiles", response_model=List[RequestProfileSummary])
+async def list_profiles():
+    """List the most recent request profiles, newest first."""
+    return [profile.summary() for profile in reversed(profiler.profiles)]
+
+
+@router.get("/admin/profiles/{profile_id}", response_model=RequestProfileOut)
+async def get_profile(profile_id: int):
+    profile = profiler.get_profile(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profile not found")
+    return profile.to_dict()
+
+
+@router.get("/admin/slow-queries", response_model=List[SlowQueryOut])
+async def list_slow_queries():
+    """List the most recent slow SQL statements with their query plans, newest first."""
+    return list(reversed(profiler.slow_queries))
+
+
+@router.delete("/admin/slow-queries", response_model=Message)
+async def clear_slow_queries():
+    profiler.slow_queries.clear()
+    return Message(message="Slow query log cleared")
+
+
+def _backup_status() -> BackupStatus:
+    return BackupStatus(
+        enabled=backup_manager.enabled,
+        running=backup_manager.running,
+        last_result=backup_manager.last_result,
+        backups=backup_manager.list_backups(),
+    )
+
+
+@router.get("/admin/backups", response_model=BackupStatus)
+def get_backups():
+    """List database backups (newest first) and the result of the last backup run."""
+    return _backup_status()
+
+
+@router.post("/admin/backups", response_model=BackupStatus, status_code=status.HTTP_202_ACCEPTED)
+def trigger_backup():
+    """Start an online backup in the background; poll GET /admin/backups for the result."""
+    if not backup_manager.enabled:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Backups are disabled: the database is not a file")
+    if not backup_manager.start_backup():
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="A backup is already running")
+    return _backup_status()
+
+
+@router.get("/admin/read-cache", response_model=ReadCacheStats)
+async def get_read_cache_stats():
+    """Counters of the shared read cache used by the polled order and menu routes."""
+    return read_cache.stats()
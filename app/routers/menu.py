@@ -1,21 +1,32 @@
 from decimal import Decimal
+from functools import partial
 from typing import List, Optional
 
-from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile, status, Request
+from fastapi import APIRouter, Depends, File, Form, HTTPException, Request, UploadFile, status
+from pydantic import TypeAdapter
 from sqlalchemy.orm import Session
 
-from ..database import get_db
+from ..database import SessionLocal, get_db
 from ..models import MenuItem
 from ..schemas import MenuItemOut, Message
+from ..utils.admission import Priority, admission_controller
 from ..utils.files import delete_file_if_exists, save_image_upload
+from ..utils.money import MAX_AMOUNT, to_cents
+from ..utils.read_cache import json_response, read_cache
+from ..utils.sync import record_menu_change, record_menu_delete
 
 
 router = APIRouter()
 
+# Reads go through read_cache, which only admits the requests that actually have to load
+READ_LIMIT = admission_controller.route("menu:read", Priority.NORMAL, max_concurrency=2)
+
 MEDIA_ROOT = "media"
 MEDIA_SUBDIR = "uploads"
 MEDIA_URL_PREFIX = "/media/"
 
+MENU_LIST = TypeAdapter(List[MenuItemOut])
+
 
 def build_photo_url(photo_path: Optional[str]) -> Optional[str]:
     if not photo_path:
@@ -26,7 +37,7 @@ def build_photo_url(photo_path: Optional[str]) -> Optional[str]:
 @router.post("/menu", response_model=MenuItemOut, status_code=status.HTTP_201_CREATED)
 async def create_menu_item(
     name: str = Form(...),
-    unit_price: Decimal = Form(...),
+    unit_price: Decimal = Form(..., le=MAX_AMOUNT),
     photo: Optional[UploadFile] = File(None),
     db: Session = Depends(get_db),
 ):
@@ -36,15 +47,17 @@ async def create_menu_item(
     if photo is not None:
         photo_path = save_image_upload(photo, media_root=MEDIA_ROOT, subdir=MEDIA_SUBDIR)
 
-    item = MenuItem(name=name, unit_price=unit_price, photo_path=photo_path)
+    item = MenuItem(name=name, unit_price_cents=to_cents(unit_price), photo_path=photo_path)
     db.add(item)
+    record_menu_change(db, item)
     db.commit()
+    read_cache.invalidate("menu")
     db.refresh(item)
 
     return MenuItemOut(
         id=item.id,
         name=item.name,
-        unit_price=item.unit_price,
+        unit_price_cents=item.unit_price_cents,
         is_active=item.is_active,
         photo_url=build_photo_url(item.photo_path),
         created_at=item.created_at,
@@ -52,41 +65,45 @@ async def create_menu_item(
     )
 
 
+def load_menu_items(active: Optional[bool]) -> bytes:
+    with SessionLocal() as db:
+        query = db.query(MenuItem)
+        if active is not None:
+            query = query.filter(MenuItem.is_active == active)
+        items = query.order_by(MenuItem.name).all()
+
+        return MENU_LIST.dump_json(
+            [
+                MenuItemOut(
+                    id=item.id,
+                    name=item.name,
+                    unit_price_cents=item.unit_price_cents,
+                    is_active=item.is_active,
+                    photo_url=build_photo_url(item.photo_path),
+                    created_at=item.created_at,
+                    updated_at=item.updated_at,
+                )
+                for item in items
+            ]
+        )
+
+
 @router.get("/menu", response_model=List[MenuItemOut])
-async def list_menu_items(
-    request: Request,
-    active: Optional[bool] = None,
-    db: Session = Depends(get_db),
-):
+async def list_menu_items(request: Request, active: Optional[bool] = None):
     """List menu items, optionally filtering by active flag (default: only active)."""
 
-    query = db.query(MenuItem)
-    if active is not None:
-        query = query.filter(MenuItem.is_active == active)
-    items = query.order_by(MenuItem.name).all()
-
-    base_url = str(request.base_url).rstrip("/")
-    media_prefix = MEDIA_URL_PREFIX.strip("/")
-
-    return [
-        MenuItemOut(
-            id=item.id,
-            name=item.name,
-            unit_price=item.unit_price,
-            is_active=item.is_active,
-            photo_url=build_photo_url(item.photo_path),
-            created_at=item.created_at,
-            updated_at=item.updated_at,
-        )
-        for item in items
-    ]
+    # Identical concurrent requests share one query (see read_cache)
+    body = await read_cache.get(
+        "menu", ("list", active), partial(load_menu_items, active), admission_controller.admission(READ_LIMIT, request)
+    )
+    return json_response(body)
 
 
 @router.put("/menu/{menu_id}", response_model=MenuItemOut)
 async def update_menu_item(
     menu_id: int,
     name: Optional[str] = Form(None),
-    unit_price: Optional[Decimal] = Form(None),
+    unit_price: Optional[Decimal] = Form(None, le=MAX_AMOUNT),
     is_active: Optional[bool] = Form(None),
     photo: Optional[UploadFile] = File(None),
     db: Session = Depends(get_db),
@@ -100,7 +117,7 @@ async def update_menu_item(
     if name is not None:
         item.name = name
     if unit_price is not None:
-        item.unit_price = unit_price
+        item.unit_price_cents = to_cents(unit_price)
     if is_active is not None:
         item.is_active = is_active
 
@@ -110,13 +127,15 @@ async def update_menu_item(
         item.photo_path = save_image_upload(photo, media_root=MEDIA_ROOT, subdir=MEDIA_SUBDIR)
 
     db.add(item)
+    record_menu_change(db, item)
     db.commit()
+    read_cache.invalidate("menu")
     db.refresh(item)
 
     return MenuItemOut(
         id=item.id,
         name=item.name,
-        unit_price=item.unit_price,
+        unit_price_cents=item.unit_price_cents,
         is_active=item.is_active,
         photo_url=build_photo_url(item.photo_path),
         created_at=item.created_at,
@@ -136,7 +155,10 @@ async def delete_menu_item(
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Menu item not found")
 
     delete_file_if_exists(item.photo_path, media_root=MEDIA_ROOT)
+    record_menu_delete(db, item)
     db.delete(item)
     db.commit()
+    # Deleting the menu item also clears menu_item_id on its order items
+    read_cache.invalidate("menu", "orders")
 
     return Message(message="Menu item deleted")
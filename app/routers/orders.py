@@ -1,23 +1,41 @@
-from collections import defaultdict
-from decimal import Decimal
+from functools import partial
 from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from pydantic import TypeAdapter
+from sqlalchemy import func, text
+from sqlalchemy.orm import Session, selectinload
 
-from ..database import get_db
+from ..config import settings
+from ..database import SessionLocal, get_db
 from ..models import MenuItem, Order, OrderItem, OrderStatus
 from ..schemas import ItemStats, Message, OrderCreate, OrderOut, OrderStats
+from ..utils.admission import Priority, admission_controller
+from ..utils.aggregates import item_totals
+from ..utils.money import MAX_AMOUNT_CENTS
 from ..utils.order_code import generate_order_code
+from ..utils.read_cache import json_response, read_cache
+from ..utils.search import build_prefix_match_query
+from ..utils.sync import record_order_change, record_order_delete, record_orders_cleared
 
 router = APIRouter()
 
+# Admission control: order writes are never shed; dashboard reads are capped
+# and shed first when the server is busy. The reads go through read_cache,
+# which only admits the requests that actually have to load.
+WRITE_ADMISSION = Depends(admission_controller.limit("orders:write", Priority.HIGH))
+READ_LIMIT = admission_controller.route("orders:read", Priority.NORMAL, max_concurrency=4)
+STATS_LIMIT = admission_controller.route("orders:stats", Priority.LOW, max_concurrency=1, rate=1.0, burst=5)
+
+
+ORDER_LIST = TypeAdapter(List[OrderOut])
+
 
 def serialize_order(order: Order) -> OrderOut:
     return OrderOut.from_orm(order)
 
 
-@router.post("/orders", response_model=OrderOut, status_code=status.HTTP_201_CREATED)
+@router.post("/orders", response_model=OrderOut, status_code=status.HTTP_201_CREATED, dependencies=[WRITE_ADMISSION])
 async def create_order(payload: OrderCreate, db: Session = Depends(get_db)):
     if not payload.items:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Order must contain at least one item")
@@ -35,56 +53,74 @@ async def create_order(payload: OrderCreate, db: Session = Depends(get_db)):
     if len(menu_map) != len(menu_ids):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Some menu items are invalid or inactive")
 
-    order = Order(customer_name=payload.customer_name, status=OrderStatus.NEW.value, total_price=Decimal("0.00"), preorder=payload.preorder)
+    order = Order(customer_name=payload.customer_name, status=OrderStatus.NEW.value, total_price_cents=0, preorder=payload.preorder)
     db.add(order)
     db.flush()  # get order.id
 
-    total_price = Decimal("0.00")
+    # Money is integer cents: exact and cheap to sum
+    total_price_cents = 0
+    order_items: List[OrderItem] = []
 
     for item in payload.items:
         menu = menu_map[item.menu_item_id]
-        unit_price = Decimal(menu.unit_price)
-        line_total = unit_price * item.quantity
+        line_total_cents = menu.unit_price_cents * item.quantity
         order_item = OrderItem(
             order_id=order.id,
             menu_item_id=menu.id,
             item_name=menu.name,
-            unit_price=unit_price,
+            unit_price_cents=menu.unit_price_cents,
             quantity=item.quantity,
-            line_total=line_total,
+            line_total_cents=line_total_cents,
         )
         db.add(order_item)
-        total_price += line_total
+        order_items.append(order_item)
+        total_price_cents += line_total_cents
 
-    order.total_price = total_price
+    if total_price_cents > MAX_AMOUNT_CENTS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Order total is too large")
+
+    order.total_price_cents = total_price_cents
     # Generate order code after getting ID
-    order.order_code = generate_order_code(order.id)
+    order.order_code = generate_order_code(order.id, settings.booth_id)
 
     db.add(order)
+    record_order_change(db, order, order_items)
     db.commit()
+    read_cache.invalidate("orders")
     db.refresh(order)
 
     return serialize_order(order)
 
 
+def load_orders(status_filter: Optional[OrderStatus], preorder_filter: Optional[bool]) -> bytes:
+    with SessionLocal() as db:
+        query = db.query(Order).options(selectinload(Order.items)).order_by(Order.created_at.asc())
+        if preorder_filter is not None:
+            query = query.filter(Order.preorder == preorder_filter)
+        if status_filter is not None:
+            query = query.filter(Order.status == status_filter.value)
+
+        orders = query.all()
+        return ORDER_LIST.dump_json([serialize_order(o) for o in orders])
+
+
 @router.get("/orders", response_model=List[OrderOut])
 async def list_orders(
+    request: Request,
     status_filter: Optional[OrderStatus] = Query(None, alias="status"),
     preorder_filter: Optional[bool] = Query(None, alias="preorder"),
-    db: Session = Depends(get_db),
 ):
-    query = db.query(Order).order_by(Order.created_at.asc())
-    if preorder_filter is not None:
-        query = query.filter(Order.preorder == preorder_filter)
-    if status_filter is not None:
-        query = query.filter(Order.status == status_filter.value)
-    
-
-    orders = query.all()
-    return [serialize_order(o) for o in orders]
+    # Polled by every kitchen / pickup screen: identical requests share one query (see read_cache)
+    body = await read_cache.get(
+        "orders",
+        ("list", status_filter, preorder_filter),
+        partial(load_orders, status_filter, preorder_filter),
+        admission_controller.admission(READ_LIMIT, request),
+    )
+    return json_response(body)
 
 
-@router.post("/orders/{order_id}/cancel", response_model=OrderOut)
+@router.post("/orders/{order_id}/cancel", response_model=OrderOut, dependencies=[WRITE_ADMISSION])
 async def cancel_order(order_id: int, db: Session = Depends(get_db)):
     order: Optional[Order] = db.query(Order).filter(Order.id == order_id).first()
     if order is None:
@@ -95,13 +131,15 @@ async def cancel_order(order_id: int, db: Session = Depends(get_db)):
 
     order.status = OrderStatus.CANCELED.value
     db.add(order)
+    record_order_change(db, order)
     db.commit()
+    read_cache.invalidate("orders")
     db.refresh(order)
 
     return serialize_order(order)
 
 
-@router.post("/orders/{order_id}/await", response_model=OrderOut)
+@router.post("/orders/{order_id}/await", response_model=OrderOut, dependencies=[WRITE_ADMISSION])
 async def await_order(order_id: int, db: Session = Depends(get_db)):
     order: Optional[Order] = db.query(Order).filter(Order.id == order_id).first()
     if order is None:
@@ -112,13 +150,15 @@ async def await_order(order_id: int, db: Session = Depends(get_db)):
 
     order.status = OrderStatus.AWAITING.value
     db.add(order)
+    record_order_change(db, order)
     db.commit()
+    read_cache.invalidate("orders")
     db.refresh(order)
 
     return serialize_order(order)
 
 
-@router.post("/orders/{order_id}/complete", response_model=OrderOut)
+@router.post("/orders/{order_id}/complete", response_model=OrderOut, dependencies=[WRITE_ADMISSION])
 async def complete_order(order_id: int, db: Session = Depends(get_db)):
     order: Optional[Order] = db.query(Order).filter(Order.id == order_id).first()
     if order is None:
@@ -129,13 +169,15 @@ async def complete_order(order_id: int, db: Session = Depends(get_db)):
 
     order.status = OrderStatus.COMPLETED.value
     db.add(order)
+    record_order_change(db, order)
     db.commit()
+    read_cache.invalidate("orders")
     db.refresh(order)
 
     return serialize_order(order)
 
 
-@router.post("/orders/{order_id}/reset", response_model=OrderOut)
+@router.post("/orders/{order_id}/reset", response_model=OrderOut, dependencies=[WRITE_ADMISSION])
 async def reset_order_to_new(order_id: int, db: Session = Depends(get_db)):
     """
     Reset an order back to NEW status.
@@ -153,7 +195,9 @@ async def reset_order_to_new(order_id: int, db: Session = Depends(get_db)):
 
     order.status = OrderStatus.NEW.value
     db.add(order)
+    record_order_change(db, order)
     db.commit()
+    read_cache.invalidate("orders")
     db.refresh(order)
 
     return serialize_order(order)
@@ -164,40 +208,91 @@ async def list_order_statuses():
     return [status.value for status in OrderStatus]
 
 
-@router.get("/orders/stats", response_model=OrderStats)
-async def get_order_stats(
+def load_search_results(sql: str, params: dict) -> bytes:
+    with SessionLocal() as db:
+        order_ids = [row[0] for row in db.execute(text(sql), params)]
+        if not order_ids:
+            return ORDER_LIST.dump_json([])
+
+        orders = db.query(Order).options(selectinload(Order.items)).filter(Order.id.in_(order_ids)).all()
+        orders_by_id = {o.id: o for o in orders}
+        return ORDER_LIST.dump_json(
+            [serialize_order(orders_by_id[order_id]) for order_id in order_ids if order_id in orders_by_id]
+        )
+
+
+@router.get("/orders/search", response_model=List[OrderOut])
+async def search_orders(
+    request: Request,
+    q: str = Query(..., min_length=1, description="Customer or item name prefix(es)"),
     status_filter: Optional[OrderStatus] = Query(None, alias="status"),
     preorder_filter: Optional[bool] = Query(None, alias="preorder"),
-    db: Session = Depends(get_db),
+    limit: int = Query(50, ge=1, le=200),
 ):
-    query = db.query(Order)
+    """
+    Search orders by customer name and item names using the 'orders_fts' index.
+    Every term is prefix-matched; results are returned newest first.
+    """
+    match = build_prefix_match_query(q)
+    if match is None:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Search query must not be blank")
+
+    sql = "SELECT o.id FROM orders_fts JOIN orders o ON o.id = orders_fts.rowid WHERE orders_fts MATCH :match"
+    params: dict[str, object] = {"match": match, "limit": limit}
     if status_filter is not None:
-        query = query.filter(Order.status == status_filter.value)
+        sql += " AND o.status = :status"
+        params["status"] = status_filter.value
     if preorder_filter is not None:
-        query = query.filter(Order.preorder == preorder_filter)
+        sql += " AND o.preorder = :preorder"
+        params["preorder"] = preorder_filter
+    sql += " ORDER BY orders_fts.rowid DESC LIMIT :limit"
 
-    orders: List[Order] = query.all()
+    key = ("search", match, status_filter, preorder_filter, limit)
+    body = await read_cache.get(
+        "orders", key, partial(load_search_results, sql, params), admission_controller.admission(READ_LIMIT, request)
+    )
+    return json_response(body)
 
-    total_orders = len(orders)
-    total_amount = Decimal("0.00")
 
-    item_map: dict[str, dict[str, Decimal | int]] = defaultdict(
-        lambda: {"quantity": 0, "amount": Decimal("0.00")}
-    )
+def compute_order_stats(status_filter: Optional[OrderStatus], preorder_filter: Optional[bool]) -> bytes:
+    criteria = []
+    if status_filter is not None:
+        criteria.append(Order.status == status_filter.value)
+    if preorder_filter is not None:
+        criteria.append(Order.preorder == preorder_filter)
 
-    for order in orders:
-        for item in order.items:
-            total_amount += item.line_total
-            agg = item_map[item.item_name]
-            agg["quantity"] += item.quantity
-            agg["amount"] += item.line_total
+    # Aggregated in SQL over integer cents; no order rows are loaded
+    with SessionLocal() as db:
+        total_orders = db.query(func.count(Order.id)).filter(*criteria).scalar()
+        totals = item_totals(db, *criteria)
 
     items_stats: List[ItemStats] = [
-        ItemStats(item_name=name, total_quantity=data["quantity"], total_amount=data["amount"])
-        for name, data in item_map.items()
+        ItemStats(
+            item_name=row.item_name,
+            total_quantity=row.total_quantity,
+            total_amount_cents=row.total_amount_cents,
+        )
+        for row in totals
     ]
+    total_amount_cents = sum(row.total_amount_cents for row in totals)
 
-    return OrderStats(total_orders=total_orders, total_amount=total_amount, items=items_stats)
+    stats = OrderStats(total_orders=total_orders, total_amount_cents=total_amount_cents, items=items_stats)
+    return stats.model_dump_json().encode()
+
+
+@router.get("/orders/stats", response_model=OrderStats)
+async def get_order_stats(
+    request: Request,
+    status_filter: Optional[OrderStatus] = Query(None, alias="status"),
+    preorder_filter: Optional[bool] = Query(None, alias="preorder"),
+):
+    body = await read_cache.get(
+        "orders",
+        ("stats", status_filter, preorder_filter),
+        partial(compute_order_stats, status_filter, preorder_filter),
+        admission_controller.admission(STATS_LIMIT, request),
+    )
+    return json_response(body)
 
 
 @router.delete("/orders/{order_id}", response_model=Message)
@@ -207,8 +302,10 @@ async def delete_order(order_id: int, db: Session = Depends(get_db)):
     if order is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Order not found")
 
+    record_order_delete(db, order)
     db.delete(order)
     db.commit()
+    read_cache.invalidate("orders")
 
     return Message(message=f"Deleted order {order_id}")
 
@@ -222,6 +319,8 @@ async def delete_all_orders(db: Session = Depends(get_db)):
     for order in orders:
         db.delete(order)
 
+    record_orders_cleared(db)
     db.commit()
+    read_cache.invalidate("orders")
 
     return Message(message=f"Deleted {deleted_count} orders")
@@ -0,0 +1,74 @@
+from typing import Callable
+
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.exceptions import RequestValidationError
+from fastapi.routing import APIRoute
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..database import get_db
+from ..models import SyncCursor
+from ..schemas import SyncAck, SyncBatch, SyncBoothStatus, SyncStatus
+from ..utils.admission import Priority, admission_controller
+from ..utils.read_cache import read_cache
+from ..utils.sync import SHIPPED_CURSOR, apply_batch, get_cursor, get_last_logged_seq
+
+
+class SyncRoute(APIRoute):
+    """Report malformed batches as 400 (like other rejected batches) instead of 422."""
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+
+        async def route_handler(request: Request) -> Response:
+            try:
+                return await handler(request)
+            except RequestValidationError as exc:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=jsonable_encoder({"message": "Invalid sync batch", "errors": exc.errors()}),
+                )
+
+        return route_handler
+
+
+router = APIRouter(route_class=SyncRoute)
+
+# Batches are applied one at a time; a shed booth simply retries on its next sync
+SYNC_ADMISSION = Depends(admission_controller.limit("sync", Priority.NORMAL, max_concurrency=1))
+
+
+@router.post("/sync/batches", response_model=SyncAck, dependencies=[SYNC_ADMISSION])
+def receive_sync_batch(batch: SyncBatch, db: Session = Depends(get_db)):
+    """
+    Merge a batch of change-log entries shipped by a booth (aggregator side).
+    Entries already applied are skipped, so re-sending a batch is safe.
+    """
+    if settings.booth_id and batch.booth_id == settings.booth_id:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="A booth cannot sync to itself")
+
+    try:
+        applied_through = apply_batch(db, batch.booth_id, batch.entries)
+    except (ValueError, KeyError, TypeError) as exc:
+        db.rollback()
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid sync batch: {exc}")
+    read_cache.invalidate("orders", "menu")
+
+    return SyncAck(booth_id=batch.booth_id, applied_through=applied_through)
+
+
+@router.get("/sync/status", response_model=SyncStatus)
+def get_sync_status(db: Session = Depends(get_db)):
+    """Show this instance's change-log position and, on an aggregator, each booth's progress."""
+    booth_cursors = db.query(SyncCursor).filter(SyncCursor.name.startswith("booth:")).order_by(SyncCursor.name).all()
+    return SyncStatus(
+        booth_id=settings.booth_id,
+        aggregator_url=settings.aggregator_url,
+        last_logged_seq=get_last_logged_seq(db),
+        last_shipped_seq=get_cursor(db, SHIPPED_CURSOR),
+        booths=[
+            SyncBoothStatus(booth_id=cursor.name.split(":", 1)[1], applied_through=cursor.last_seq)
+            for cursor in booth_cursors
+        ],
+    )
@@ -2,11 +2,18 @@ from __future__ import annotations
 
 from datetime import datetime
 from decimal import Decimal
-from typing import List, Optional
+from typing import Annotated, List, Literal, Optional, Union
 
-from pydantic import BaseModel, Field
+from pydantic import AfterValidator, BaseModel, BeforeValidator, Field, model_validator
 
 from .models import OrderStatus
+from .utils.money import MAX_AMOUNT, from_cents
+from .utils.order_code import check_booth_id
+
+# Money is stored and aggregated as integer cents. Output fields of this type
+# read the '<name>_cents' attribute (via validation_alias) and expose it as a
+# 2-place Decimal, so this is the only place cents are converted to Decimal.
+CentsAsDecimal = Annotated[Decimal, BeforeValidator(from_cents)]
 
 
 # ===== Menu Schemas =====
@@ -14,7 +21,7 @@ from .models import OrderStatus
 
 class MenuItemBase(BaseModel):
     name: str = Field(..., description="Item name")
-    unit_price: Decimal = Field(..., description="Unit price")
+    unit_price: Decimal = Field(..., le=MAX_AMOUNT, description="Unit price")
 
 
 class MenuItemCreate(MenuItemBase):
@@ -23,11 +30,12 @@ class MenuItemCreate(MenuItemBase):
 
 class MenuItemUpdate(BaseModel):
     name: Optional[str] = None
-    unit_price: Optional[Decimal] = None
+    unit_price: Optional[Decimal] = Field(None, le=MAX_AMOUNT)
     is_active: Optional[bool] = None
 
 
 class MenuItemOut(MenuItemBase):
+    unit_price: CentsAsDecimal = Field(..., validation_alias="unit_price_cents", description="Unit price")
     id: int
     is_active: bool
     photo_url: Optional[str] = None
@@ -56,9 +64,9 @@ class OrderItemOut(BaseModel):
     id: int
     menu_item_id: Optional[int]
     item_name: str
-    unit_price: Decimal
+    unit_price: CentsAsDecimal = Field(..., validation_alias="unit_price_cents")
     quantity: int
-    line_total: Decimal
+    line_total: CentsAsDecimal = Field(..., validation_alias="line_total_cents")
 
     class Config:
         from_attributes = True
@@ -70,7 +78,7 @@ class OrderOut(BaseModel):
     customer_name: str
     status: OrderStatus
     preorder: bool
-    total_price: Decimal
+    total_price: CentsAsDecimal = Field(..., validation_alias="total_price_cents")
     created_at: datetime
     updated_at: datetime
     items: List[OrderItemOut]
@@ -85,15 +93,175 @@ class OrderOut(BaseModel):
 class ItemStats(BaseModel):
     item_name: str
     total_quantity: int
-    total_amount: Decimal
+    total_amount: CentsAsDecimal = Field(..., validation_alias="total_amount_cents")
 
 
 class OrderStats(BaseModel):
     total_orders: int
-    total_amount: Decimal
+    total_amount: CentsAsDecimal = Field(..., validation_alias="total_amount_cents")
     items: List[ItemStats]
 
 
+# ===== Sync Schemas =====
+
+
+class SyncOrderItemPayload(BaseModel):
+    menu_item_id: Optional[int] = None
+    item_name: str
+    unit_price: Decimal = Field(..., ge=0, le=MAX_AMOUNT)
+    quantity: int = Field(..., gt=0)
+    line_total: Decimal = Field(..., ge=0, le=MAX_AMOUNT)
+
+
+class SyncOrderPayload(BaseModel):
+    customer_name: str
+    status: OrderStatus
+    preorder: bool
+    total_price: Decimal = Field(..., ge=0, le=MAX_AMOUNT)
+    created_at: datetime
+    updated_at: datetime
+    items: List[SyncOrderItemPayload]
+
+
+class SyncMenuItemPayload(BaseModel):
+    name: str
+    unit_price: Decimal = Field(..., ge=0, le=MAX_AMOUNT)
+    is_active: bool
+    created_at: datetime
+    updated_at: datetime
+
+
+class SyncEntry(BaseModel):
+    seq: int = Field(..., gt=0)
+    entity: Literal["order", "menu_item"]
+    op: Literal["upsert", "delete", "clear"]
+    entity_key: Optional[str] = None
+    payload: Optional[Union[SyncOrderPayload, SyncMenuItemPayload]] = None
+    created_at: datetime
+
+    @model_validator(mode="after")
+    def check_operation(self) -> "SyncEntry":
+        """Reject entries the aggregator could not apply, before any entry of the batch is applied."""
+        if self.op == "clear":
+            if self.entity != "order":
+                raise ValueError("only orders can be cleared")
+            return self
+        if not self.entity_key:
+            raise ValueError(f"'{self.op}' entries need an entity_key")
+        if self.op == "upsert":
+            expected = SyncOrderPayload if self.entity == "order" else SyncMenuItemPayload
+            if not isinstance(self.payload, expected):
+                raise ValueError(f"'{self.entity}' upserts need a valid {self.entity} payload")
+        return self
+
+
+class SyncBatch(BaseModel):
+    booth_id: Annotated[str, AfterValidator(check_booth_id)] = Field(..., pattern=r"^[A-Za-z0-9]{1,10}$")
+    entries: List[SyncEntry]
+
+
+class SyncAck(BaseModel):
+    booth_id: str
+    applied_through: int
+
+
+class SyncBoothStatus(BaseModel):
+    booth_id: str
+    applied_through: int
+
+
+class SyncStatus(BaseModel):
+    booth_id: Optional[str]
+    aggregator_url: Optional[str]
+    last_logged_seq: int
+    last_shipped_seq: int
+    booths: List[SyncBoothStatus]
+
+
+# ===== Admin Schemas =====
+
+
+class ProfilingSettings(BaseModel):
+    enabled: bool = Field(..., description="Profile every request, not only those sent with 'X-Profile: 1'")
+    slow_query_threshold_ms: float = Field(..., gt=0)
+
+
+class ProfilingSettingsUpdate(BaseModel):
+    enabled: Optional[bool] = None
+    slow_query_threshold_ms: Optional[float] = Field(None, gt=0)
+
+
+class SqlStatementOut(BaseModel):
+    sql: str
+    parameters: str
+    duration_ms: float
+    rows: int
+
+
+class StackSample(BaseModel):
+    stack: str
+    samples: int
+
+
+class RequestProfileSummary(BaseModel):
+    id: int
+    method: str
+    path: str
+    status_code: Optional[int]
+    started_at: datetime
+    duration_ms: Optional[float]
+    statement_count: int
+    sql_ms: float
+
+
+class RequestProfileOut(RequestProfileSummary):
+    samples: int
+    stacks: List[StackSample]
+    statements: List[SqlStatementOut]
+    dropped_statements: int
+
+
+class SlowQueryOut(BaseModel):
+    recorded_at: datetime
+    sql: str
+    parameters: str
+    duration_ms: float
+    query_plan: Optional[List[str]]
+    profile_id: Optional[int]
+
+
+class BackupFile(BaseModel):
+    name: str
+    size_bytes: int
+    created_at: datetime
+
+
+class BackupResult(BaseModel):
+    name: Optional[str]
+    started_at: datetime
+    duration_ms: Optional[float]
+    size_bytes: Optional[int]
+    integrity_ok: bool
+    error: Optional[str]
+
+
+class BackupStatus(BaseModel):
+    enabled: bool
+    running: bool
+    last_result: Optional[BackupResult]
+    backups: List[BackupFile]
+
+
+class ReadCacheStats(BaseModel):
+    ttl_seconds: float
+    entries: int
+    in_flight: int
+    hits: int = Field(..., description="Requests served from a cached body")
+    coalesced: int = Field(..., description="Requests that joined another request's in-flight load")
+    loads: int = Field(..., description="Loads that queried the database")
+    invalidations: int
+
+
 # ===== Common =====
 
 
@@ -0,0 +1,292 @@
+import asyncio
+import heapq
+import itertools
+import math
+import time
+from enum import IntEnum
+from typing import Callable, Collection, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException, Request, status
+
+from ..config import settings
+
+
+class Priority(IntEnum):
+    """Admission priority; lower values are admitted first."""
+
+    HIGH = 0  # order creation and status transitions
+    NORMAL = 1  # cheap reads polled by kitchen / pickup screens
+    LOW = 2  # expensive reads: stats, reports
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: int) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def take(self) -> float:
+        """Take a token. Returns 0 on success, else seconds until one is available."""
+
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class RouteLimit:
+    """Per-route admission settings and state, created by AdmissionController.route()."""
+
+    MAX_CLIENTS = 1024
+
+    def __init__(
+        self,
+        name: str,
+        priority: Priority,
+        max_concurrency: Optional[int],
+        rate: Optional[float],
+        burst: int,
+    ) -> None:
+        self.name = name
+        self.priority = priority
+        self.max_concurrency = max_concurrency
+        self.rate = rate
+        self.burst = burst
+        self.in_flight = 0
+        self.buckets: Dict[str, TokenBucket] = {}
+
+    @property
+    def has_capacity(self) -> bool:
+        return self.max_concurrency is None or self.in_flight < self.max_concurrency
+
+    def take_token(self, client: str) -> float:
+        if self.rate is None:
+            return 0.0
+        bucket = self.buckets.get(client)
+        if bucket is None:
+            if len(self.buckets) >= self.MAX_CLIENTS:
+                # Drop the oldest bucket; an idle client simply starts with a full bucket again
+                self.buckets.pop(next(iter(self.buckets)))
+            bucket = self.buckets[client] = TokenBucket(self.rate, self.burst)
+        return bucket.take()
+
+
+class AdmissionController:
+    """Priority-aware admission control shared by all routes.
+
+    At most `max_concurrency` managed requests run at once (they all share one
+    event loop and one SQLite file), of which `reserved_high` slots can only be
+    used by HIGH priority requests; each route may also have its own, smaller
+    concurrency limit. Waiting requests are admitted highest priority first.
+    Requests that are not HIGH priority are shed with 503 + Retry-After when the
+    queue is full or when they have waited longer than `target_queue_delay`;
+    HIGH priority requests are never shed. Optional per-client token buckets
+    reject bursts from a single client with 429 + Retry-After. Clients are
+    told apart by address: behind a reverse proxy, set `client_ip_header`
+    (e.g. X-Forwarded-For) and list the proxy addresses in `trusted_proxies`,
+    otherwise every client shares the proxy's bucket.
+
+    All state is only touched from the event loop, so no locking is needed.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 8,
+        max_queue: int = 64,
+        target_queue_delay: float = 0.1,
+        reserved_high: int = 2,
+        client_ip_header: Optional[str] = None,
+        trusted_proxies: Collection[str] = (),
+    ) -> None:
+        self.max_concurrency = max_concurrency
+        self.reserved_high = reserved_high
+        self.max_queue = max_queue
+        self.target_queue_delay = target_queue_delay
+        self.client_ip_header = client_ip_header
+        self.trusted_proxies = set(trusted_proxies)
+        self.in_flight = 0
+        self.routes: Dict[str, RouteLimit] = {}
+        self._waiters: List[Tuple[int, int, RouteLimit, asyncio.Future]] = []
+        self._counter = itertools.count()
+
+    def route(
+        self,
+        name: str,
+        priority: Priority,
+        max_concurrency: Optional[int] = None,
+        rate: Optional[float] = None,
+        burst: int = 1,
+    ) -> RouteLimit:
+        """Register (or look up) the limits of a route.
+
+        `rate` (requests per second) and `burst` configure the per-client token
+        bucket; leave `rate` unset to disable it.
+        """
+
+        return self.routes.setdefault(name, RouteLimit(name, priority, max_concurrency, rate, burst))
+
+    def limit(
+        self,
+        name: str,
+        priority: Priority,
+        max_concurrency: Optional[int] = None,
+        rate: Optional[float] = None,
+        burst: int = 1,
+    ) -> Callable:
+        """Build a FastAPI dependency applying admission control to a route (see route())."""
+
+        route = self.route(name, priority, max_concurrency, rate, burst)
+
+        async def admission_dependency(request: Request):
+            admission = self.admission(route, request)
+            admission.check_rate()
+            async with admission:
+                yield
+
+        return admission_dependency
+
+    def admission(self, route: RouteLimit, request: Request) -> "Admission":
+        """Admission of one request to `route`, for handlers that only need a slot for part of their work."""
+
+        return Admission(self, route, self.client_key(request))
+
+    def client_key(self, request: Request) -> str:
+        """Address the per-client token buckets are keyed on."""
+
+        host = request.client.host if request.client else "unknown"
+        if self.client_ip_header is None or not self._is_trusted(host):
+            return host
+        forwarded = request.headers.get(self.client_ip_header)
+        if not forwarded:
+            return host
+        # Each proxy appends the address it received the request from: the
+        # rightmost address that is not a trusted proxy is the client
+        addresses = [address.strip() for address in forwarded.split(",") if address.strip()]
+        for address in reversed(addresses):
+            if not self._is_trusted(address):
+                return address
+        return addresses[0] if addresses else host
+
+    def _is_trusted(self, host: str) -> bool:
+        return "*" in self.trusted_proxies or host in self.trusted_proxies
+
+    def check_rate(self, route: RouteLimit, client: str) -> None:
+        retry_after = route.take_token(client)
+        if retry_after:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many requests, slow down",
+                headers={"Retry-After": str(math.ceil(retry_after))},
+            )
+
+    async def acquire(self, route: RouteLimit) -> None:
+        if self._has_slot(route) and not self._waiters:
+            self._admit(route)
+            return
+
+        sheddable = route.priority != Priority.HIGH
+        if sheddable and len(self._waiters) >= self.max_queue:
+            self._shed()
+
+        future: asyncio.Future = asyncio.get_running_loop().create_future()
+        entry = (int(route.priority), next(self._counter), route, future)
+        heapq.heappush(self._waiters, entry)
+        self._dispatch()
+        try:
+            if sheddable:
+                await asyncio.wait_for(asyncio.shield(future), self.target_queue_delay)
+            else:
+                await future
+        except asyncio.TimeoutError:
+            if not future.done():
+                self._remove_waiter(entry)
+                self._shed()
+        except BaseException:
+            # Cancelled while waiting; hand the slot on if it was already granted
+            if future.done() and not future.cancelled():
+                self.release(route)
+            else:
+                self._remove_waiter(entry)
+            raise
+
+    def release(self, route: RouteLimit) -> None:
+        self.in_flight -= 1
+        route.in_flight -= 1
+        self._dispatch()
+
+    def _has_slot(self, route: RouteLimit) -> bool:
+        limit = self.max_concurrency
+        if route.priority != Priority.HIGH:
+            limit -= self.reserved_high
+        return self.in_flight < limit and route.has_capacity
+
+    def _admit(self, route: RouteLimit) -> None:
+        self.in_flight += 1
+        route.in_flight += 1
+
+    def _shed(self) -> None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server busy, retry later",
+            headers={"Retry-After": str(max(1, math.ceil(self.target_queue_delay)))},
+        )
+
+    def _remove_waiter(self, entry: Tuple[int, int, RouteLimit, asyncio.Future]) -> None:
+        if entry in self._waiters:
+            self._waiters.remove(entry)
+            heapq.heapify(self._waiters)
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        """Admit waiters in priority order while there is capacity.
+
+        A waiter that cannot run yet (route at its own limit, or only reserved
+        slots left) is skipped so it does not block other waiters behind it.
+        """
+
+        skipped = []
+        while self._waiters and self.in_flight < self.max_concurrency:
+            entry = heapq.heappop(self._waiters)
+            _, _, route, future = entry
+            if future.done():
+                continue
+            if not self._has_slot(route):
+                skipped.append(entry)
+                continue
+            self._admit(route)
+            future.set_result(None)
+        for entry in skipped:
+            heapq.heappush(self._waiters, entry)
+
+
+class Admission:
+    """One request's admission to a route: check_rate() takes the client's token
+    (429 if there is none) and `async with` holds a concurrency slot (503 if shed).
+
+    Kept apart so a handler can rate limit the request up front but only hold a
+    slot while it does the expensive part, e.g. inside a shared read_cache load.
+    """
+
+    def __init__(self, controller: AdmissionController, route: RouteLimit, client: str) -> None:
+        self.controller = controller
+        self.route = route
+        self.client = client
+
+    def check_rate(self) -> None:
+        self.controller.check_rate(self.route, self.client)
+
+    async def __aenter__(self) -> None:
+        await self.controller.acquire(self.route)
+
+    async def __aexit__(self, *exc_info) -> None:
+        self.controller.release(self.route)
+
+
+admission_controller = AdmissionController(
+    client_ip_header=settings.client_ip_header,
+    trusted_proxies=[ip.strip() for ip in settings.trusted_proxies.split(",") if ip.strip()],
+)
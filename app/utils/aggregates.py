@@ -0,0 +1,27 @@
+from typing import List
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from ..models import Order, OrderItem
+
+
+def item_totals(db: Session, *criteria) -> List:
+    """Per-item quantity and amount (integer cents) over orders matching `criteria`.
+
+    Aggregated by SQLite in one GROUP BY query; rows are (item_name,
+    total_quantity, total_amount_cents), in order of first appearance.
+    """
+
+    return (
+        db.query(
+            OrderItem.item_name,
+            func.sum(OrderItem.quantity).label("total_quantity"),
+            func.sum(OrderItem.line_total_cents).label("total_amount_cents"),
+        )
+        .join(Order, Order.id == OrderItem.order_id)
+        .filter(*criteria)
+        .group_by(OrderItem.item_name)
+        .order_by(func.min(OrderItem.id))
+        .all()
+    )
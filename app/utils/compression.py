@@ -0,0 +1,179 @@
+import gzip
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:  # Optional: pip install brotli
+    import brotli
+except ImportError:  # pragma: no cover - depends on the environment
+    brotli = None
+
+try:  # Optional: pip install zstandard
+    import zstandard
+except ImportError:  # pragma: no cover - depends on the environment
+    zstandard = None
+
+
+COMPRESSIBLE_TYPES = ("application/json", "text/")
+
+
+def _build_compressors() -> Dict[str, Callable[[bytes], bytes]]:
+    """Return the available encoders, most preferred first."""
+
+    compressors: Dict[str, Callable[[bytes], bytes]] = {}
+    if zstandard is not None:
+        zstd_compressor = zstandard.ZstdCompressor(level=3)
+        compressors["zstd"] = zstd_compressor.compress
+    if brotli is not None:
+        compressors["br"] = lambda body: brotli.compress(body, quality=5)
+    compressors["gzip"] = lambda body: gzip.compress(body, compresslevel=6, mtime=0)
+    return compressors
+
+
+COMPRESSORS = _build_compressors()
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """Pick the preferred available encoding allowed by an Accept-Encoding header."""
+
+    accepted = set()
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        q = params.strip()
+        if q.startswith("q="):
+            try:
+                if float(q[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(name.strip())
+
+    for encoding in COMPRESSORS:
+        if encoding in accepted or "*" in accepted:
+            return encoding
+    return None
+
+
+class CompressedBodyCache:
+    """Small thread-safe LRU of compressed bodies keyed by body content and encoding.
+
+    Polling clients get byte-identical bodies until the underlying data
+    changes, so the body itself acts as the content version and each version
+    is compressed only once per encoding. Entries are looked up by hash() and
+    confirmed by comparing the stored body, which is much cheaper than a
+    cryptographic digest or recompressing.
+    """
+
+    def __init__(self, max_entries: int = 128, max_bytes: int = 16 * 1024 * 1024) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Tuple[int, str], Tuple[bytes, bytes]]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, body: bytes, encoding: str) -> Optional[bytes]:
+        key = (hash(body), encoding)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != body:
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, body: bytes, encoding: str, compressed: bytes) -> None:
+        entry_size = len(body) + len(compressed)
+        if entry_size > self.max_bytes:
+            return
+        key = (hash(body), encoding)
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous[0]) + len(previous[1])
+            self._entries[key] = (body, compressed)
+            self._size += entry_size
+            while len(self._entries) > self.max_entries or self._size > self.max_bytes:
+                _, (evicted_body, evicted) = self._entries.popitem(last=False)
+                self._size -= len(evicted_body) + len(evicted)
+
+
+class CompressionMiddleware:
+    """Compress JSON/text responses with zstd, brotli or gzip.
+
+    Only complete (single message) bodies of at least `minimum_size` bytes
+    are compressed; streamed responses (static files, Excel reports, which
+    are already zip archives) pass through untouched. Compressed bytes for
+    GET responses are cached in a CompressedBodyCache.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 500,
+        cache: Optional[CompressedBodyCache] = None,
+    ) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.cache = cache if cache is not None else CompressedBodyCache()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        cacheable = scope["method"] == "GET"
+        initial_message: Message = {}
+        passthrough = False
+
+        async def send_compressed(message: Message) -> None:
+            nonlocal initial_message, passthrough
+
+            if message["type"] == "http.response.start":
+                initial_message = message
+                headers = Headers(raw=message["headers"])
+                content_type = headers.get("content-type", "")
+                passthrough = "content-encoding" in headers or not content_type.startswith(COMPRESSIBLE_TYPES)
+                return
+
+            if message["type"] != "http.response.body" or passthrough:
+                if initial_message:
+                    await send(initial_message)
+                    initial_message = {}
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            if message.get("more_body", False) or len(body) < self.minimum_size:
+                passthrough = True
+                await send(initial_message)
+                initial_message = {}
+                await send(message)
+                return
+
+            compressed = self._compress(body, encoding, cacheable and initial_message["status"] == 200)
+            headers = MutableHeaders(raw=initial_message["headers"])
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(compressed))
+            headers.add_vary_header("Accept-Encoding")
+            await send(initial_message)
+            initial_message = {}
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, send_compressed)
+
+    def _compress(self, body: bytes, encoding: str, cacheable: bool) -> bytes:
+        if not cacheable:
+            return COMPRESSORS[encoding](body)
+
+        compressed = self.cache.get(body, encoding)
+        if compressed is None:
+            compressed = COMPRESSORS[encoding](body)
+            self.cache.put(body, encoding, compressed)
+        return compressed
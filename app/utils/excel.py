@@ -1,15 +1,34 @@
-from datetime import datetime
-from decimal import Decimal
+import logging
+import multiprocessing
+import os
+import threading
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from io import BytesIO
-from typing import Iterable
+from typing import Iterable, List, Optional, Sequence
 
 from openpyxl import Workbook
 from openpyxl.styles import Alignment, Font, PatternFill
 
-from ..models import Order, OrderItem
+OrderRow = namedtuple(
+    "OrderRow",
+    "id order_code created_at customer_name status item_name quantity unit_price_cents line_total_cents",
+)
+ItemTotal = namedtuple("ItemTotal", "item_name total_quantity total_amount_cents")
 
+logger = logging.getLogger(__name__)
 
-def generate_orders_excel(orders: Iterable[Order]) -> BytesIO:
+
+def generate_orders_excel(rows: Iterable, item_totals: Sequence) -> BytesIO:
+    """Build the orders report workbook.
+
+    `rows` are order item rows (id, order_code, created_at, customer_name,
+    status, item_name, quantity, unit_price_cents, line_total_cents);
+    `item_totals` are (item_name, total_quantity, total_amount_cents) rows as
+    returned by utils.aggregates.item_totals. Amounts are written in currency
+    units.
+    """
     wb = Workbook()
     ws = wb.active
     ws.title = "Orders"
@@ -38,41 +57,30 @@ def generate_orders_excel(orders: Iterable[Order]) -> BytesIO:
         cell.alignment = Alignment(horizontal="center")
 
     # Data rows
-    total_amount = Decimal("0.00")
     row_index = 1
 
-    item_aggregates: dict[str, dict[str, Decimal | int]] = {}
-
-    for order in orders:
-        for item in order.items:
-            row_index += 1
-            ws.append(
-                [
-                    order.id,
-                    order.order_code,
-                    order.created_at.strftime("%Y-%m-%d %H:%M:%S"),
-                    order.customer_name,
-                    order.status,
-                    item.item_name,
-                    item.quantity,
-                    float(item.unit_price),
-                    float(item.line_total),
-                ]
-            )
-            total_amount += item.line_total
-
-            # Aggregate by item_name
-            agg = item_aggregates.setdefault(
-                item.item_name,
-                {"quantity": 0, "amount": Decimal("0.00")},
-            )
-            agg["quantity"] += item.quantity
-            agg["amount"] += item.line_total
+    for row in rows:
+        row_index += 1
+        ws.append(
+            [
+                row.id,
+                row.order_code,
+                row.created_at.strftime("%Y-%m-%d %H:%M:%S"),
+                row.customer_name,
+                row.status,
+                row.item_name,
+                row.quantity,
+                row.unit_price_cents / 100,
+                row.line_total_cents / 100,
+            ]
+        )
+
+    total_amount_cents = sum(total.total_amount_cents for total in item_totals)
 
     # Totals section
     row_index += 2
     ws.cell(row=row_index, column=1, value="Total Amount:")
-    ws.cell(row=row_index, column=2, value=float(total_amount))
+    ws.cell(row=row_index, column=2, value=total_amount_cents / 100)
 
     # Item aggregates section
     row_index += 2
@@ -87,9 +95,9 @@ def generate_orders_excel(orders: Iterable[Order]) -> BytesIO:
         cell.fill = header_fill
         cell.alignment = Alignment(horizontal="center")
 
-    for name, agg in item_aggregates.items():
+    for total in item_totals:
         row_index += 1
-        ws.append([name, agg["quantity"], float(agg["amount"])])
+        ws.append([total.item_name, total.total_quantity, total.total_amount_cents / 100])
 
     # Auto-fit-ish column widths
     for column_cells in ws.columns:
@@ -101,3 +109,61 @@ def generate_orders_excel(orders: Iterable[Order]) -> BytesIO:
     wb.save(output)
     output.seek(0)
     return output
+
+
+def _build_orders_excel(rows: List[tuple], item_totals: List[tuple]) -> bytes:
+    return generate_orders_excel([OrderRow(*row) for row in rows], [ItemTotal(*total) for total in item_totals]).getvalue()
+
+
+def _lower_priority() -> None:
+    if hasattr(os, "nice"):
+        os.nice(19)
+
+
+class ReportBuilder:
+    """Builds report workbooks in a separate, low-priority worker process.
+
+    openpyxl is pure Python, so building a large workbook in the server holds
+    the GIL for seconds and order writes wait behind it. The worker has its own
+    interpreter and runs at the lowest OS priority, so it mostly gets CPU time
+    the server leaves idle. It is started on first use, with 'spawn' so it
+    inherits none of the server's threads or database connections, and replaced
+    if it dies. If it cannot run (e.g. the app is embedded in a script without
+    an `if __name__ == "__main__"` guard, which 'spawn' needs), the workbook is
+    built in the calling thread instead.
+    """
+
+    def __init__(self) -> None:
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def build_orders_excel(self, rows: Iterable, item_totals: Sequence) -> bytes:
+        """generate_orders_excel() in the worker; returns the workbook bytes."""
+
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=1,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_lower_priority,
+                )
+            executor = self._executor
+        rows = [tuple(row) for row in rows]
+        item_totals = [tuple(total) for total in item_totals]
+        try:
+            return executor.submit(_build_orders_excel, rows, item_totals).result()
+        except BrokenProcessPool:
+            logger.warning("Report worker process failed; building the report in the server process")
+            with self._lock:
+                if self._executor is executor:
+                    self._executor = None
+            return _build_orders_excel(rows, item_totals)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+
+report_builder = ReportBuilder()
@@ -0,0 +1,18 @@
+from decimal import ROUND_HALF_UP, Decimal
+
+# Largest amount the former Numeric(10, 2) columns held. Inputs are validated
+# against it, which keeps cents (and sums of them) far inside SQLite's 64-bit INTEGER.
+MAX_AMOUNT = Decimal("99999999.99")
+MAX_AMOUNT_CENTS = 9999999999
+
+
+def to_cents(amount: Decimal) -> int:
+    """Convert a decimal amount to integer cents, rounding half up to 2 places."""
+
+    return int(Decimal(amount).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP).scaleb(2))
+
+
+def from_cents(cents: int) -> Decimal:
+    """Convert integer cents to a decimal amount with 2 places, e.g. 4550 -> Decimal("45.50")."""
+
+    return Decimal(int(cents)).scaleb(-2)
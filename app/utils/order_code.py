@@ -1,8 +1,29 @@
+from typing import Optional
 
+ORDER_CODE_PREFIX = "ORD"
 
 
-def generate_order_code(order_id: int) -> str:
-    """Generate an order code like ORD-YYYYMMDD-0001 based on the order id."""
+def check_booth_id(booth_id: str) -> str:
+    """Reject booth ids that would make booth-prefixed order codes ambiguous.
+
+    A booth 'ORD' would prefix its codes as ORD-ORD-0001, and the aggregator
+    could not tell its ORD-0001 from its own unprefixed orders.
+    """
+
+    if booth_id == ORDER_CODE_PREFIX:
+        raise ValueError(f"'{ORDER_CODE_PREFIX}' is the order code prefix and cannot be used as a booth id")
+    return booth_id
+
+
+def generate_order_code(order_id: int, booth_id: Optional[str] = None) -> str:
+    """Generate an order code like ORD-0001 based on the order id.
+
+    With a booth id the code is prefixed with it (e.g. A-ORD-0001) so codes
+    stay unique when the sync aggregator merges orders from several booths.
+    """
 
     #today_str = datetime.now(datetime.t).strftime("%Y%m%d")
-    return f"ORD-{order_id:04d}"
+    code = f"{ORDER_CODE_PREFIX}-{order_id:04d}"
+    if booth_id:
+        code = f"{booth_id}-{code}"
+    return code
@@ -0,0 +1,273 @@
+import itertools
+import sqlite3
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Deque, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+PROFILE_HEADER = "x-profile"
+SAMPLE_INTERVAL = 0.005  # seconds between stack samples
+MAX_PROFILES = 50
+MAX_SLOW_QUERIES = 100
+MAX_STATEMENTS_PER_PROFILE = 500
+MAX_STACKS_PER_PROFILE = 200
+MAX_STACK_DEPTH = 48
+MAX_PARAMS_LENGTH = 200
+
+
+def _fold_stack(frame) -> str:
+    """Render a frame's call stack outermost-first as 'file:function;...' (folded stack format)."""
+
+    names: List[str] = []
+    while frame is not None and len(names) < MAX_STACK_DEPTH:
+        code = frame.f_code
+        names.append(f"{code.co_filename.rsplit('/', 1)[-1]}:{code.co_name}")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class RequestProfile:
+    """Sampling profile and SQL statement log of a single request.
+
+    A daemon thread samples the stacks of the threads the request has run on
+    (the event loop thread, plus any threadpool thread that executed SQL for
+    it) every SAMPLE_INTERVAL seconds. Concurrent requests served by the same
+    event loop show up in the loop thread's samples too.
+    """
+
+    def __init__(self, profile_id: int, method: str, path: str) -> None:
+        self.id = profile_id
+        self.method = method
+        self.path = path
+        self.status_code: Optional[int] = None
+        self.started_at = datetime.utcnow()
+        self.duration_ms: Optional[float] = None
+        self.statements: List[dict] = []
+        self.dropped_statements = 0
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.thread_ids = {threading.get_ident()}
+        self._start = time.perf_counter()
+        self._stop = threading.Event()
+        self._sampler = threading.Thread(target=self._sample, name=f"profile-{profile_id}", daemon=True)
+
+    def start(self) -> None:
+        self._sampler.start()
+
+    def finish(self) -> None:
+        self.duration_ms = (time.perf_counter() - self._start) * 1000
+        # Not joined: the sampler exits within one interval and must not block the event loop
+        self._stop.set()
+
+    def add_statement(self, entry: dict) -> bool:
+        self.thread_ids.add(threading.get_ident())
+        if len(self.statements) >= MAX_STATEMENTS_PER_PROFILE:
+            self.dropped_statements += 1
+            return False
+        self.statements.append(entry)
+        return True
+
+    def summary(self) -> dict:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "status_code": self.status_code,
+            "started_at": self.started_at,
+            "duration_ms": self.duration_ms,
+            "statement_count": len(self.statements) + self.dropped_statements,
+            "sql_ms": sum(s["duration_ms"] for s in self.statements),
+        }
+
+    def to_dict(self) -> dict:
+        data = self.summary()
+        data["samples"] = self.samples
+        data["stacks"] = [{"stack": stack, "samples": count} for stack, count in self.stacks.most_common()]
+        data["statements"] = list(self.statements)
+        data["dropped_statements"] = self.dropped_statements
+        return data
+
+    def _sample(self) -> None:
+        own_id = threading.get_ident()
+        while not self._stop.wait(SAMPLE_INTERVAL):
+            frames = sys._current_frames()
+            for thread_id in list(self.thread_ids):
+                frame = frames.get(thread_id)
+                if frame is None or thread_id == own_id:
+                    continue
+                self.samples += 1
+                stack = _fold_stack(frame)
+                if stack not in self.stacks and len(self.stacks) >= MAX_STACKS_PER_PROFILE:
+                    stack = "<other>"
+                self.stacks[stack] += 1
+
+
+_current_profile: ContextVar[Optional[RequestProfile]] = ContextVar("current_profile", default=None)
+
+
+class Profiler:
+    """Keeps the most recent request profiles and slow queries in bounded buffers."""
+
+    def __init__(self, slow_query_threshold_ms: float = 50.0) -> None:
+        self.enabled = False
+        self.slow_query_threshold_ms = slow_query_threshold_ms
+        self.profiles: Deque[RequestProfile] = deque(maxlen=MAX_PROFILES)
+        self.slow_queries: Deque[dict] = deque(maxlen=MAX_SLOW_QUERIES)
+        self._ids = itertools.count(1)
+
+    def should_profile(self, scope: Scope) -> bool:
+        if scope["path"].startswith("/admin"):
+            return False
+        if self.enabled:
+            return True
+        return Headers(scope=scope).get(PROFILE_HEADER, "").lower() in {"1", "true", "yes"}
+
+    def get_profile(self, profile_id: int) -> Optional[RequestProfile]:
+        for profile in self.profiles:
+            if profile.id == profile_id:
+                return profile
+        return None
+
+    def start_profile(self, method: str, path: str) -> RequestProfile:
+        profile = RequestProfile(next(self._ids), method, path)
+        profile.start()
+        return profile
+
+    def finish_profile(self, profile: RequestProfile) -> None:
+        profile.finish()
+        self.profiles.append(profile)
+
+    def record_slow_query(self, cursor, statement: str, parameters, duration_ms: float, executemany: bool) -> None:
+        plan: Optional[List[str]] = None
+        keyword = statement.lstrip()[:6].upper()
+        if not executemany and keyword.startswith(("SELECT", "INSERT", "UPDATE", "DELETE", "WITH")):
+            try:
+                rows = cursor.connection.execute(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()
+                plan = [row[3] for row in rows]
+            except sqlite3.Error:
+                plan = None
+        profile = _current_profile.get()
+        self.slow_queries.append(
+            {
+                "recorded_at": datetime.utcnow(),
+                "sql": statement,
+                "parameters": _format_parameters(parameters),
+                "duration_ms": duration_ms,
+                "query_plan": plan,
+                "profile_id": profile.id if profile is not None else None,
+            }
+        )
+
+
+profiler = Profiler()
+
+
+def _format_parameters(parameters) -> str:
+    text = repr(parameters)
+    if len(text) > MAX_PARAMS_LENGTH:
+        text = text[: MAX_PARAMS_LENGTH - 3] + "..."
+    return text
+
+
+class RowCountingCursor(sqlite3.Cursor):
+    """sqlite3 cursor that adds fetched row counts to the profile entry of its statement."""
+
+    profile_entry: Optional[dict] = None
+
+    def fetchone(self):
+        row = super().fetchone()
+        if row is not None and self.profile_entry is not None:
+            self.profile_entry["rows"] += 1
+        return row
+
+    def fetchmany(self, *args, **kwargs):
+        rows = super().fetchmany(*args, **kwargs)
+        if self.profile_entry is not None:
+            self.profile_entry["rows"] += len(rows)
+        return rows
+
+    def fetchall(self):
+        rows = super().fetchall()
+        if self.profile_entry is not None:
+            self.profile_entry["rows"] += len(rows)
+        return rows
+
+
+class ProfilingConnection(sqlite3.Connection):
+    """sqlite3 connection factory whose cursors count fetched rows (see RowCountingCursor)."""
+
+    def cursor(self, factory=RowCountingCursor):
+        return super().cursor(factory)
+
+
+def install_query_hooks(engine: Engine) -> None:
+    """Time every statement; log it to the current request profile and, if slow, the slow-query log."""
+
+    # The start time lives on the statement's execution context: it is dropped
+    # with the context when a statement fails (no after_cursor_execute), rather
+    # than piling up on the pooled connection
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        context._query_start = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        duration_ms = (time.perf_counter() - context._query_start) * 1000
+
+        profile = _current_profile.get()
+        if profile is not None:
+            entry = {
+                "sql": statement,
+                "parameters": _format_parameters(parameters),
+                "duration_ms": duration_ms,
+                # DML reports affected rows; SELECT rows are counted as they are fetched
+                "rows": max(cursor.rowcount, 0),
+            }
+            if profile.add_statement(entry) and isinstance(cursor, RowCountingCursor):
+                cursor.profile_entry = entry
+        elif isinstance(cursor, RowCountingCursor):
+            cursor.profile_entry = None
+
+        if duration_ms >= profiler.slow_query_threshold_ms:
+            profiler.record_slow_query(cursor, statement, parameters, duration_ms, executemany)
+
+
+class ProfilingMiddleware:
+    """Profile requests sent with 'X-Profile: 1' (or all requests while profiling is enabled).
+
+    The profile id is returned in the 'X-Profile-Id' response header; the
+    profile itself is available at /admin/profiles/{id}.
+    """
+
+    def __init__(self, app: ASGIApp, profiler: Profiler = profiler) -> None:
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self.profiler.should_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        profile = self.profiler.start_profile(scope["method"], scope["path"])
+        token = _current_profile.set(profile)
+
+        async def send_with_profile_id(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                profile.status_code = message["status"]
+                MutableHeaders(scope=message)["X-Profile-Id"] = str(profile.id)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            _current_profile.reset(token)
+            self.profiler.finish_profile(profile)
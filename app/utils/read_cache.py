@@ -0,0 +1,118 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Optional, Tuple
+
+from fastapi import Response
+from starlette.concurrency import run_in_threadpool
+
+from ..config import settings
+from .admission import Admission
+
+
+class ReadCache:
+    """Single-flight, short-TTL cache of rendered JSON bodies for polled read routes.
+
+    Identical concurrent requests (same namespace and key, e.g. route and
+    filters) share one load: the first starts it and the others await the same
+    result. The body is then served for `ttl` seconds. Write handlers call
+    invalidate() for the namespaces they changed right after they commit. That
+    bumps the namespace's generation, which is part of every key, so neither
+    cached bodies nor loads that started before the write are served again.
+
+    A load is shared by several requests and runs as its own task, so it must
+    open its own database session instead of using a request's; it is a plain
+    function run in the threadpool, so its queries don't block the event loop.
+    Admission control applies to loads only: cache hits and requests joining a
+    load are served straight away, the request starting a load is rate limited
+    (its own 429), and the load holds the route's concurrency slot while it runs.
+    Bodies are bytes, so the CompressionMiddleware cache hits on them as well.
+    """
+
+    def __init__(self, ttl: float = 1.0, max_entries: int = 256) -> None:
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.coalesced = 0
+        self.loads = 0
+        self.invalidations = 0
+        self._generations: Dict[str, int] = {}
+        self._entries: "OrderedDict[Tuple[str, int, Hashable], Tuple[float, bytes]]" = OrderedDict()
+        self._flights: Dict[Tuple[str, int, Hashable], asyncio.Future] = {}
+        # invalidate() may be called from threadpool handlers
+        self._lock = threading.Lock()
+
+    async def get(
+        self,
+        namespace: str,
+        key: Hashable,
+        load: Callable[[], bytes],
+        admission: Optional[Admission] = None,
+    ) -> bytes:
+        """Return the cached body for `key`, joining or starting a `load()` if there is none."""
+
+        with self._lock:
+            full_key = (namespace, self._generations.get(namespace, 0), key)
+            entry = self._entries.get(full_key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(full_key)
+                self.hits += 1
+                return entry[1]
+            flight = self._flights.get(full_key)
+            if flight is None:
+                if admission is not None:
+                    admission.check_rate()
+                self.loads += 1
+                flight = self._flights[full_key] = asyncio.ensure_future(self._load(full_key, load, admission))
+            else:
+                self.coalesced += 1
+        # Shielded: a cancelled request must not cancel the load for the others
+        return await asyncio.shield(flight)
+
+    def invalidate(self, *namespaces: str) -> None:
+        with self._lock:
+            for namespace in namespaces:
+                self._generations[namespace] = self._generations.get(namespace, 0) + 1
+            for full_key in [k for k in self._entries if k[0] in namespaces]:
+                del self._entries[full_key]
+            self.invalidations += 1
+
+    def stats(self) -> dict:
+        return {
+            "ttl_seconds": self.ttl,
+            "entries": len(self._entries),
+            "in_flight": len(self._flights),
+            "hits": self.hits,
+            "coalesced": self.coalesced,
+            "loads": self.loads,
+            "invalidations": self.invalidations,
+        }
+
+    async def _load(
+        self, full_key: Tuple[str, int, Hashable], load: Callable[[], bytes], admission: Optional[Admission]
+    ) -> bytes:
+        try:
+            if admission is None:
+                body = await run_in_threadpool(load)
+            else:
+                async with admission:
+                    body = await run_in_threadpool(load)
+            namespace, generation, _ = full_key
+            with self._lock:
+                if self.ttl > 0 and self._generations.get(namespace, 0) == generation:
+                    self._entries[full_key] = (time.monotonic() + self.ttl, body)
+                    self._entries.move_to_end(full_key)
+                    while len(self._entries) > self.max_entries:
+                        self._entries.popitem(last=False)
+            return body
+        finally:
+            with self._lock:
+                self._flights.pop(full_key, None)
+
+
+def json_response(body: bytes) -> Response:
+    return Response(content=body, media_type="application/json")
+
+
+read_cache = ReadCache(ttl=settings.read_cache_ttl_seconds)
@@ -0,0 +1,16 @@
+from typing import Optional
+
+
+def build_prefix_match_query(q: str) -> Optional[str]:
+    """Turn free text into an FTS5 MATCH expression with prefix matching.
+
+    Every whitespace-separated term is quoted (so FTS5 operators and
+    punctuation typed by staff are treated literally) and suffixed with "*",
+    and all terms must match, e.g. 'wang ch' -> '"wang"* "ch"*'.
+    Returns None if the text contains no terms.
+    """
+
+    terms = [term.replace('"', '""') for term in q.split()]
+    if not terms:
+        return None
+    return " ".join(f'"{term}"*' for term in terms)
@@ -0,0 +1,358 @@
+import json
+import logging
+import threading
+import urllib.request
+from datetime import datetime
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..database import SessionLocal
+from ..models import ChangeLog, MenuItem, Order, OrderItem, SyncCursor
+from ..schemas import SyncEntry, SyncMenuItemPayload, SyncOrderPayload
+from .money import from_cents, to_cents
+
+logger = logging.getLogger(__name__)
+
+SHIPPED_CURSOR = "shipped"
+
+
+# ===== Recording (booth side) =====
+#
+# Called by the order/menu handlers before they commit, so each log entry is
+# written in the same transaction as the mutation (one extra INSERT, no extra
+# commit). Nothing is recorded unless BOOTH_ID is configured. Amounts are
+# shipped as decimal strings, like in the API.
+
+
+def _json_default(value):
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def _append(db: Session, entity: str, op: str, entity_key: Optional[str], payload: Optional[dict] = None) -> None:
+    db.add(
+        ChangeLog(
+            entity=entity,
+            op=op,
+            entity_key=entity_key,
+            payload=None if payload is None else json.dumps(payload, default=_json_default, ensure_ascii=False),
+        )
+    )
+
+
+def record_order_change(db: Session, order: Order, items: Optional[Iterable[OrderItem]] = None) -> None:
+    """Log a snapshot of a created/updated order. Pass `items` if they are not in `order.items` yet."""
+    if not settings.booth_id:
+        return
+    db.flush()  # apply defaults / onupdate timestamps so the snapshot matches what is committed
+    payload = {
+        "customer_name": order.customer_name,
+        "status": order.status,
+        "preorder": order.preorder,
+        "total_price": from_cents(order.total_price_cents),
+        "created_at": order.created_at,
+        "updated_at": order.updated_at,
+        "items": [
+            {
+                "menu_item_id": item.menu_item_id,
+                "item_name": item.item_name,
+                "unit_price": from_cents(item.unit_price_cents),
+                "quantity": item.quantity,
+                "line_total": from_cents(item.line_total_cents),
+            }
+            for item in (order.items if items is None else items)
+        ],
+    }
+    _append(db, "order", "upsert", order.order_code, payload)
+
+
+def record_order_delete(db: Session, order: Order) -> None:
+    if settings.booth_id:
+        _append(db, "order", "delete", order.order_code)
+
+
+def record_orders_cleared(db: Session) -> None:
+    if settings.booth_id:
+        _append(db, "order", "clear", None)
+
+
+def record_menu_change(db: Session, item: MenuItem) -> None:
+    if not settings.booth_id:
+        return
+    db.flush()
+    payload = {
+        "name": item.name,
+        "unit_price": from_cents(item.unit_price_cents),
+        "is_active": item.is_active,
+        "created_at": item.created_at,
+        "updated_at": item.updated_at,
+    }
+    _append(db, "menu_item", "upsert", str(item.id), payload)
+
+
+def record_menu_delete(db: Session, item: MenuItem) -> None:
+    if settings.booth_id:
+        _append(db, "menu_item", "delete", str(item.id))
+
+
+# ===== Cursors =====
+
+
+def get_cursor(db: Session, name: str) -> int:
+    cursor: Optional[SyncCursor] = db.get(SyncCursor, name)
+    return cursor.last_seq if cursor is not None else 0
+
+
+def set_cursor(db: Session, name: str, last_seq: int) -> None:
+    cursor: Optional[SyncCursor] = db.get(SyncCursor, name)
+    if cursor is None:
+        db.add(SyncCursor(name=name, last_seq=last_seq))
+    else:
+        cursor.last_seq = last_seq
+
+
+def get_last_logged_seq(db: Session) -> int:
+    return db.query(func.max(ChangeLog.id)).scalar() or 0
+
+
+# ===== Shipping (booth side) =====
+
+
+def ship_once() -> int:
+    """Send the next batch of unshipped log entries to the aggregator.
+
+    Returns the number of entries shipped. The 'shipped' cursor is set to what
+    the aggregator acknowledged, so a failed or repeated send is simply
+    retried (the aggregator skips entries it has already applied), and the
+    cursor moves back if the aggregator is missing earlier entries.
+    """
+    db = SessionLocal()
+    try:
+        shipped = get_cursor(db, SHIPPED_CURSOR)
+        entries: List[ChangeLog] = (
+            db.query(ChangeLog)
+            .filter(ChangeLog.id > shipped)
+            .order_by(ChangeLog.id.asc())
+            .limit(settings.sync_batch_size)
+            .all()
+        )
+        if not entries:
+            return 0
+
+        batch = {
+            "booth_id": settings.booth_id,
+            "entries": [
+                {
+                    "seq": entry.id,
+                    "entity": entry.entity,
+                    "op": entry.op,
+                    "entity_key": entry.entity_key,
+                    "payload": None if entry.payload is None else json.loads(entry.payload),
+                    "created_at": entry.created_at.isoformat(),
+                }
+                for entry in entries
+            ],
+        }
+        request = urllib.request.Request(
+            f"{settings.aggregator_url.rstrip('/')}/sync/batches",
+            data=json.dumps(batch, ensure_ascii=False).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+            method="POST",
+        )
+        with urllib.request.urlopen(request, timeout=10) as response:
+            ack = json.load(response)
+
+        set_cursor(db, SHIPPED_CURSOR, int(ack["applied_through"]))
+        db.commit()
+        return len(entries)
+    finally:
+        db.close()
+
+
+class ChangeLogShipper:
+    """Background thread shipping the change log to the aggregator every sync interval.
+
+    Runs off the event loop so neither the HTTP round trip nor the log query
+    touches request handling; while the network is down it keeps retrying and
+    the booth keeps taking orders locally.
+    """
+
+    def __init__(self) -> None:
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="change-log-shipper", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=15)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                shipped = ship_once()
+            except Exception as exc:  # keep retrying whatever went wrong (network down, aggregator error, ...)
+                logger.warning("Change log sync to %s failed: %s", settings.aggregator_url, exc)
+                shipped = 0
+            # A full batch means there is a backlog: continue right away
+            if shipped < settings.sync_batch_size:
+                self._stop.wait(settings.sync_interval_seconds)
+
+
+# ===== Merging (aggregator side) =====
+
+_apply_lock = threading.Lock()
+
+
+def _booth_prefix(booth_id: str) -> str:
+    return f"{booth_id}-"
+
+
+def _merged_order_code(booth_id: str, order_code: str) -> str:
+    """Prefix a booth's order code with its booth id unless the booth already did.
+
+    Unprefixed codes (logged before BOOTH_ID was set) get the prefix too, so a
+    booth's orders never share a code with the aggregator's own ORD-nnnn ones.
+    """
+    prefix = _booth_prefix(booth_id)
+    return order_code if order_code.startswith(prefix) else f"{prefix}{order_code}"
+
+
+def _menu_source_key(booth_id: str, menu_item_id) -> str:
+    return f"{booth_id}:{menu_item_id}"
+
+
+def apply_batch(db: Session, booth_id: str, entries: Iterable[SyncEntry]) -> int:
+    """Merge a batch of a booth's log entries; returns the last applied sequence number.
+
+    Idempotent: entries at or below the booth's cursor were applied before and
+    are skipped, and each entry is an upsert/delete keyed by booth-prefixed
+    order code or menu source key. The batch is applied in one transaction.
+    Entries are validated by the SyncEntry schema beforehand; ValueError is
+    still raised for unknown entities or operations.
+
+    Entries are only applied in sequence: at a gap (e.g. the aggregator was
+    restored from a backup or started on a fresh database) applying stops and
+    the returned cursor makes the booth rewind and resend from there, instead
+    of the missing entries being acknowledged and lost.
+    """
+    with _apply_lock:
+        cursor_name = f"booth:{booth_id}"
+        applied = get_cursor(db, cursor_name)
+        menu_ids: Dict[str, Optional[int]] = {}
+
+        for entry in sorted(entries, key=lambda e: e.seq):
+            if entry.seq <= applied:
+                continue
+            if entry.seq != applied + 1:
+                logger.warning(
+                    "Booth %s sent entry %d but %d is the next to apply; asking it to resend",
+                    booth_id,
+                    entry.seq,
+                    applied + 1,
+                )
+                break
+            if entry.entity == "order":
+                _apply_order_entry(db, booth_id, entry, menu_ids)
+            elif entry.entity == "menu_item":
+                _apply_menu_entry(db, booth_id, entry)
+                menu_ids.clear()
+            else:
+                raise ValueError(f"Unknown entity '{entry.entity}' in entry {entry.seq}")
+            db.flush()  # later entries in the batch may look this one up (autoflush is off)
+            applied = entry.seq
+
+        set_cursor(db, cursor_name, applied)
+        db.commit()
+        return applied
+
+
+def _apply_order_entry(db: Session, booth_id: str, entry: SyncEntry, menu_ids: Dict[str, Optional[int]]) -> None:
+    if entry.op == "clear":
+        # Not startswith(): SQLite's LIKE ignores case, so booth 'a' would clear booth 'A'
+        prefix = _booth_prefix(booth_id)
+        for order in db.query(Order).filter(func.substr(Order.order_code, 1, len(prefix)) == prefix).all():
+            db.delete(order)
+        return
+
+    if not entry.entity_key:
+        raise ValueError(f"Entry {entry.seq} has no order code")
+    order_code = _merged_order_code(booth_id, entry.entity_key)
+    order: Optional[Order] = db.query(Order).filter(Order.order_code == order_code).first()
+
+    if entry.op == "delete":
+        if order is not None:
+            db.delete(order)
+        return
+    if entry.op != "upsert":
+        raise ValueError(f"Unknown order operation '{entry.op}' in entry {entry.seq}")
+
+    data: SyncOrderPayload = entry.payload
+    if order is None:
+        order = Order(order_code=order_code)
+        db.add(order)
+    order.customer_name = data.customer_name
+    order.status = data.status.value
+    order.preorder = data.preorder
+    order.total_price_cents = to_cents(data.total_price)
+    order.created_at = data.created_at
+    order.updated_at = data.updated_at
+
+    snapshot = [
+        (item.item_name, to_cents(item.unit_price), item.quantity, to_cents(item.line_total))
+        for item in data.items
+    ]
+    current = [(i.item_name, i.unit_price_cents, i.quantity, i.line_total_cents) for i in order.items]
+    if current == snapshot:
+        return  # status transition: items unchanged
+
+    items = []
+    for item in data.items:
+        menu_item_id = None
+        if item.menu_item_id is not None:
+            source_key = _menu_source_key(booth_id, item.menu_item_id)
+            if source_key not in menu_ids:
+                menu_ids[source_key] = db.query(MenuItem.id).filter(MenuItem.source_key == source_key).scalar()
+            menu_item_id = menu_ids[source_key]
+        items.append(
+            OrderItem(
+                menu_item_id=menu_item_id,
+                item_name=item.item_name,
+                unit_price_cents=to_cents(item.unit_price),
+                quantity=item.quantity,
+                line_total_cents=to_cents(item.line_total),
+            )
+        )
+    order.items = items
+
+
+def _apply_menu_entry(db: Session, booth_id: str, entry: SyncEntry) -> None:
+    source_key = _menu_source_key(booth_id, entry.entity_key)
+    item: Optional[MenuItem] = db.query(MenuItem).filter(MenuItem.source_key == source_key).first()
+
+    if entry.op == "delete":
+        if item is not None:
+            db.delete(item)
+        return
+    if entry.op != "upsert":
+        raise ValueError(f"Unknown menu operation '{entry.op}' in entry {entry.seq}")
+
+    data: SyncMenuItemPayload = entry.payload
+    if item is None:
+        item = MenuItem(source_key=source_key)
+        db.add(item)
+    item.name = data.name
+    item.unit_price_cents = to_cents(data.unit_price)
+    item.is_active = data.is_active
+    item.created_at = data.created_at
+    item.updated_at = data.updated_at
@@ -0,0 +1,109 @@
+"""Load test: order-write latency while dashboards hammer stats and reports.
+
+Starts the server (uvicorn) on a temporary database seeded with completed
+orders, then for DURATION seconds:
+- DASHBOARDS clients loop on /orders/stats, fetching /reports/orders.xlsx every
+  fifth request, each from its own address (X-Forwarded-For, trusted from
+  localhost) and backing off briefly on 429/503;
+- one till creates an order and moves it to AWAITING, every 50 ms.
+The dashboards run in their own process so that the till's timings don't
+include waiting behind them on a shared client event loop.
+
+Prints the write latency percentiles and the dashboard status codes, and
+exits non-zero if write p99 misses the SLO.
+
+    python benchmarks/admission_load.py [--duration 15] [--dashboards 30] [--slo-p99-ms 250]
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import sys
+import time
+
+import httpx
+
+from common import format_latencies, percentiles, running_server, seed_database, temporary_workdir
+
+
+async def run_dashboards(base_url: str, stop_at: float, dashboards: int, codes: dict) -> None:
+    async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+
+        async def dashboard(i: int) -> None:
+            headers = {"X-Forwarded-For": f"10.0.{i // 250}.{i % 250 + 1}"}
+            n = 0
+            while time.time() < stop_at:
+                path = "/reports/orders.xlsx" if n % 5 == 4 else "/orders/stats"
+                n += 1
+                response = await client.get(path, headers=headers)
+                codes[response.status_code] = codes.get(response.status_code, 0) + 1
+                if response.status_code in (429, 503):
+                    await asyncio.sleep(0.2)
+
+        await asyncio.gather(*(dashboard(i) for i in range(dashboards)))
+
+
+def dashboards_process(base_url: str, stop_at: float, dashboards: int, results) -> None:
+    codes: dict = {}
+    asyncio.run(run_dashboards(base_url, stop_at, dashboards, codes))
+    results.put(codes)
+
+
+async def run_till(base_url: str, stop_at: float) -> list:
+    latencies = []
+    async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+        await asyncio.sleep(1)  # let the dashboards saturate the server first
+        while time.time() < stop_at:
+            start = time.perf_counter()
+            created = await client.post(
+                "/orders", json={"customer_name": "Till", "items": [{"menu_item_id": 1, "quantity": 1}]}
+            )
+            latencies.append((time.perf_counter() - start) * 1000)
+            if created.status_code != 201:
+                raise RuntimeError(f"order create failed: {created.status_code}")
+            start = time.perf_counter()
+            moved = await client.post(f"/orders/{created.json()['id']}/await")
+            latencies.append((time.perf_counter() - start) * 1000)
+            if moved.status_code != 200:
+                raise RuntimeError(f"order status change failed: {moved.status_code}")
+            await asyncio.sleep(0.05)
+    return latencies
+
+
+def run_load(base_url: str, duration: float, dashboards: int) -> tuple:
+    """Run the till here and the dashboards in another process, so the till's
+    latencies don't include waiting behind the dashboards on a client event loop."""
+    stop_at = time.time() + duration
+    results = multiprocessing.Queue()
+    process = multiprocessing.Process(target=dashboards_process, args=(base_url, stop_at, dashboards, results))
+    process.start()
+    latencies = asyncio.run(run_till(base_url, stop_at))
+    codes = results.get()
+    process.join()
+    return latencies, codes
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--duration", type=float, default=15.0)
+    parser.add_argument("--dashboards", type=int, default=30)
+    parser.add_argument("--orders", type=int, default=3000, help="completed orders to seed")
+    parser.add_argument("--port", type=int, default=8190)
+    parser.add_argument("--slo-p99-ms", type=float, default=250.0)
+    args = parser.parse_args()
+
+    with temporary_workdir("admission-load-") as workdir:
+        seed_database(workdir, args.orders)
+        with running_server(workdir, args.port) as base_url:
+            latencies, codes = run_load(base_url, args.duration, args.dashboards)
+
+    p99 = percentiles(latencies)["p99"]
+    print(f"order writes: {len(latencies)}  {format_latencies(latencies)}")
+    print(f"dashboard responses: {dict(sorted(codes.items()))}")
+    met = p99 <= args.slo_p99_ms
+    print(f"SLO write p99 <= {args.slo_p99_ms:.0f} ms: {'met' if met else 'MISSED'}")
+    return 0 if met else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,99 @@
+"""Load test: order-creation latency while online backups of a large database run.
+
+Starts the server (uvicorn) on a temporary database seeded with ORDERS orders
+(300k is ~140 MB), then:
+- a till creates an order every 50 ms throughout;
+- after --baseline seconds, POST /admin/backups starts a backup, and
+  GET /admin/backups is polled until it finishes; this is repeated --backups
+  times, a second apart, to collect enough writes during backups.
+
+Prints order-creation latency outside and during the backups, each backup's
+duration, size and integrity check, and exits non-zero if a backup failed or
+p99 during the backups misses the target.
+
+    python benchmarks/backup_load.py [--orders 300000] [--backups 3] [--target-p99-ms 50]
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+
+import httpx
+
+from common import format_latencies, percentiles, running_server, seed_database, temporary_workdir
+
+
+async def run_till(client: httpx.AsyncClient, stop: asyncio.Event, writes: list) -> None:
+    while not stop.is_set():
+        started_at = time.monotonic()
+        response = await client.post("/orders", json={"customer_name": "Till", "items": [{"menu_item_id": 1, "quantity": 1}]})
+        if response.status_code != 201:
+            raise RuntimeError(f"order create failed: {response.status_code}")
+        writes.append((started_at, (time.monotonic() - started_at) * 1000))
+        await asyncio.sleep(0.05)
+
+
+async def run_backup(client: httpx.AsyncClient) -> tuple:
+    """Start a backup and wait for it; returns (started, finished, result)."""
+    started = time.monotonic()
+    response = await client.post("/admin/backups")
+    if response.status_code != 202:
+        raise RuntimeError(f"backup did not start: {response.status_code} {response.text}")
+    while True:
+        await asyncio.sleep(0.1)
+        backup_status = (await client.get("/admin/backups")).json()
+        if not backup_status["running"]:
+            return started, time.monotonic(), backup_status["last_result"]
+
+
+async def run_load(base_url: str, args: argparse.Namespace) -> tuple:
+    writes: list = []
+    windows: list = []
+    results: list = []
+    async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+        stop = asyncio.Event()
+        till = asyncio.create_task(run_till(client, stop, writes))
+        await asyncio.sleep(args.baseline)
+        for _ in range(args.backups):
+            started, finished, result = await run_backup(client)
+            windows.append((started, finished))
+            results.append(result)
+            await asyncio.sleep(1)
+        stop.set()
+        await till
+
+    during = [ms for at, ms in writes if any(start <= at <= end for start, end in windows)]
+    outside = [ms for at, ms in writes if not any(start <= at <= end for start, end in windows)]
+    return outside, during, results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--orders", type=int, default=300000)
+    parser.add_argument("--baseline", type=float, default=5.0, help="seconds of writes before the first backup")
+    parser.add_argument("--backups", type=int, default=3)
+    parser.add_argument("--port", type=int, default=8192)
+    parser.add_argument("--target-p99-ms", type=float, default=50.0)
+    args = parser.parse_args()
+
+    with temporary_workdir("backup-load-") as workdir:
+        seed_database(workdir, args.orders)
+        with running_server(workdir, args.port) as base_url:
+            outside, during, results = asyncio.run(run_load(base_url, args))
+
+    print(f"order creates outside backups: {len(outside)}  {format_latencies(outside)}")
+    print(f"order creates during backups:  {len(during)}  {format_latencies(during)}")
+    for result in results:
+        print(
+            f"backup {result['name']}: {result['duration_ms']:.0f} ms, {(result['size_bytes'] or 0) / 1e6:.0f} MB,"
+            f" integrity {'ok' if result['integrity_ok'] else 'FAILED'}{'' if not result['error'] else ', ' + result['error']}"
+        )
+    backups_ok = all(result["integrity_ok"] for result in results)
+    met = percentiles(during)["p99"] <= args.target_p99_ms
+    print(f"target p99 during backups <= {args.target_p99_ms:.0f} ms: {'met' if met else 'MISSED'}")
+    return 0 if met and backups_ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
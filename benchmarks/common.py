@@ -0,0 +1,211 @@
+"""Shared setup for the benchmarks: a seeded temporary database and a server on it.
+
+    with temporary_workdir("my-bench-") as workdir:
+        seed_database(workdir, orders=3000)
+        with running_server(workdir, port=8190) as base_url:
+            ...
+
+The server is the app under uvicorn, plus GET /_benchmark/statements, which
+returns the number of SQL statements the engine has executed so far.
+"""
+
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Sequence
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Run in the work directory, so the app's default sqlite:///./database.db lands there
+SEED = """
+import random
+import sys
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from sqlalchemy import insert
+
+from app.database import Base, engine
+from app.models import MenuItem, Order, OrderItem
+from app.utils.order_code import generate_order_code
+
+orders, new_fraction, menu_items = int(sys.argv[1]), float(sys.argv[2]), int(sys.argv[3])
+money_in_cents = sys.argv[4] == "cents"
+FOODS = ["Fried Chicken", "Bubble Tea", "Fish Balls", "Corn Dog", "Shaved Ice", "Takoyaki", "Lemonade", "Waffle"]
+FIRST = ["Wang", "Chen", "Lin", "Alice", "Bob", "Carol", "Dave", "Erin", "Mei", "Hiro", "Sam", "Yuki"]
+LAST = ["Smith", "Chang", "Lee", "Huang", "Tanaka", "Garcia", "Brown", "Wu", "Kim", "Ito"]
+
+rng = random.Random(0)
+menu = [
+    {"id": i + 1, "name": f"{FOODS[i % len(FOODS)]} {i // len(FOODS) + 1}", "unit_price_cents": 3000 + 550 * i}
+    for i in range(menu_items)
+]
+start = datetime.utcnow() - timedelta(seconds=orders)
+order_rows, item_rows = [], []
+for order_id in range(1, orders + 1):
+    created_at = start + timedelta(seconds=order_id)
+    lines = []
+    for item in rng.sample(menu, min(2, len(menu))):
+        quantity = rng.randint(1, 3)
+        lines.append((item, quantity))
+        item_rows.append(
+            {
+                "order_id": order_id,
+                "menu_item_id": item["id"],
+                "item_name": item["name"],
+                "unit_price_cents": item["unit_price_cents"],
+                "quantity": quantity,
+                "line_total_cents": item["unit_price_cents"] * quantity,
+            }
+        )
+    order_rows.append(
+        {
+            "id": order_id,
+            "order_code": generate_order_code(order_id),
+            "customer_name": f"{rng.choice(FIRST)} {rng.choice(LAST)}",
+            "status": "NEW" if order_id > orders * (1 - new_fraction) else "COMPLETED",
+            "preorder": False,
+            "total_price_cents": sum(item["unit_price_cents"] * quantity for item, quantity in lines),
+            "created_at": created_at,
+            "updated_at": created_at,
+        }
+    )
+
+if not money_in_cents:
+    # Trees from before money moved to integer cents: Numeric(10, 2) amounts
+    for row in menu + order_rows + item_rows:
+        for name in [name for name in row if name.endswith("_cents")]:
+            row[name[: -len("_cents")]] = Decimal(row.pop(name)) / 100
+
+Base.metadata.create_all(bind=engine)
+with engine.begin() as conn:
+    conn.execute(insert(MenuItem), menu)
+    conn.execute(insert(Order), order_rows)
+    conn.execute(insert(OrderItem), item_rows)
+
+# The app's startup migrations then create the search index and backfill it in
+# one statement, much faster than its triggers firing for every inserted row
+import app.main  # noqa: E402,F401
+"""
+
+LAUNCHER = """
+import sys
+
+import uvicorn
+from sqlalchemy import event
+
+from app.database import engine
+from app.main import app
+
+statements = 0
+
+
+def count_statement(*args):
+    global statements
+    statements += 1
+
+
+event.listen(engine, "after_cursor_execute", count_statement)
+
+
+@app.get("/_benchmark/statements")
+def get_statement_count():
+    return {"statements": statements}
+
+
+uvicorn.run(app, port=int(sys.argv[1]), log_level="warning")
+"""
+
+
+def server_env(root: str = ROOT, **overrides: str) -> Dict[str, str]:
+    """Environment for the seed script and the server running the app in
+    `root`: clients told apart by X-Forwarded-For (trusted from localhost),
+    no backup schedule."""
+
+    return dict(
+        os.environ,
+        PYTHONPATH=root,
+        CLIENT_IP_HEADER="X-Forwarded-For",
+        TRUSTED_PROXIES="127.0.0.1",
+        BACKUP_INTERVAL_MINUTES="0",
+        **overrides,
+    )
+
+
+@contextmanager
+def temporary_workdir(prefix: str) -> Iterator[str]:
+    with tempfile.TemporaryDirectory(prefix=prefix) as workdir:
+        os.makedirs(os.path.join(workdir, "media"))
+        yield workdir
+
+
+def seed_database(
+    workdir: str,
+    orders: int,
+    new_fraction: float = 0.0,
+    menu_items: int = 10,
+    root: str = ROOT,
+    money_in_cents: bool = True,
+) -> None:
+    """Create the database in `workdir` with `orders` 2-item orders, the newest
+    `new_fraction` of them NEW and the rest COMPLETED, using the models of the
+    app in `root` (pass money_in_cents=False for a tree that stores amounts
+    as Numeric(10, 2))."""
+
+    money = "cents" if money_in_cents else "units"
+    subprocess.run(
+        [sys.executable, "-c", SEED, str(orders), str(new_fraction), str(menu_items), money],
+        cwd=workdir,
+        env=server_env(root),
+        check=True,
+    )
+    # Flush it to disk now: otherwise the server's first WAL checkpoint (an fsync
+    # of the database file) waits for the whole seed to be written out
+    with open(os.path.join(workdir, "database.db"), "rb+") as database:
+        os.fsync(database.fileno())
+
+
+def wait_until_up(base_url: str) -> None:
+    for _ in range(100):
+        try:
+            httpx.get(f"{base_url}/health")
+            return
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    raise RuntimeError("server did not start")
+
+
+@contextmanager
+def running_server(workdir: str, port: int, root: str = ROOT, **env: str) -> Iterator[str]:
+    """Run the server (the app in `root`) on the database in `workdir`; yields its base URL."""
+
+    server = subprocess.Popen([sys.executable, "-c", LAUNCHER, str(port)], cwd=workdir, env=server_env(root, **env))
+    try:
+        base_url = f"http://127.0.0.1:{port}"
+        wait_until_up(base_url)
+        yield base_url
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def statement_count(base_url: str) -> int:
+    return httpx.get(f"{base_url}/_benchmark/statements").json()["statements"]
+
+
+def percentiles(latencies: Sequence[float]) -> Dict[str, float]:
+    """p50/p95/p99/max of latencies in ms. Inclusive quantiles, so small samples
+    are interpolated between observed values instead of extrapolated past them."""
+
+    q = statistics.quantiles(latencies, n=100, method="inclusive")
+    return {"p50": q[49], "p95": q[94], "p99": q[98], "max": max(latencies)}
+
+
+def format_latencies(latencies: Sequence[float]) -> str:
+    return "  ".join(f"{name} {value:.1f} ms" for name, value in percentiles(latencies).items())
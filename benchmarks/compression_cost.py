@@ -0,0 +1,123 @@
+"""Benchmark: CPU cost vs bytes saved by response compression.
+
+Starts the server (uvicorn) on a temporary database seeded with orders and
+fetches real JSON bodies uncompressed: the full and NEW order lists, the
+menu, stats, and search results of 1, 2 and 5 orders (bodies around the
+500-byte threshold; bodies under it are sent uncompressed but are
+measured too). Each body is then compressed in this process with every
+encoder the server has available (zstd, br, gzip; see app.utils.compression).
+
+Prints, per body and encoding: the compressed size, bytes saved, the CPU time
+per compression, the CPU time per KB saved, and the transfer time saved per
+response at --link-mbps (a congested fair Wi-Fi share). The cost of serving
+a poll from the compressed-body cache is printed last. Each compressed size is
+checked against what the server actually sends, and bodies under the
+threshold must come back uncompressed; exits non-zero if not.
+
+    python benchmarks/compression_cost.py [--orders 300] [--link-mbps 2]
+"""
+
+import argparse
+import sys
+import timeit
+from typing import Callable, List, Tuple
+
+import httpx
+
+from common import ROOT, running_server, seed_database, temporary_workdir
+
+sys.path.insert(0, ROOT)
+
+from app.utils.compression import COMPRESSORS, CompressedBodyCache  # noqa: E402
+
+MINIMUM_SIZE = 500  # as configured for CompressionMiddleware in app/main.py
+
+BODIES = [
+    ("/orders", {}),
+    ("/orders", {"status": "NEW"}),
+    ("/menu", {}),
+    ("/orders/stats", {}),
+    ("/orders/search", {"q": "f", "limit": 5}),
+    ("/orders/search", {"q": "f", "limit": 2}),
+    ("/orders/search", {"q": "f", "limit": 1}),
+]
+
+
+def seconds_per_call(function: Callable[[], object]) -> float:
+    """Best of 5 runs of a batch that takes at least ~0.1 s."""
+
+    timer = timeit.Timer(function)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=5, number=number)) / number
+
+
+def label(path: str, params: dict) -> str:
+    return path + ("?" + "&".join(f"{name}={value}" for name, value in params.items()) if params else "")
+
+
+def check_served(client: httpx.Client, path: str, params: dict, body: bytes) -> List[str]:
+    """Compare what the server sends for each encoding with compressing `body` here."""
+
+    problems = []
+    for encoding, compress in COMPRESSORS.items():
+        response = client.get(path, params=params, headers={"Accept-Encoding": encoding})
+        served = response.headers.get("content-encoding")
+        # Content-Length is the size on the wire; httpx decodes .content
+        length = int(response.headers["content-length"])
+        if len(body) < MINIMUM_SIZE:
+            if served is not None:
+                problems.append(f"{label(path, params)}: {len(body)} bytes sent with {served}")
+        elif served != encoding or length != len(compress(body)):
+            problems.append(f"{label(path, params)}: expected {encoding} {len(compress(body))} bytes, got {served} {length}")
+    return problems
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--orders", type=int, default=300, help="orders to seed, 15%% of them NEW")
+    parser.add_argument("--port", type=int, default=8193)
+    parser.add_argument("--link-mbps", type=float, default=2.0, help="bandwidth per client for the transfer time saved")
+    args = parser.parse_args()
+
+    bodies: List[Tuple[str, bytes]] = []
+    problems: List[str] = []
+    with temporary_workdir("compression-cost-") as workdir:
+        seed_database(workdir, args.orders, new_fraction=0.15)
+        with running_server(workdir, args.port) as base_url, httpx.Client(base_url=base_url, timeout=60) as client:
+            for path, params in BODIES:
+                response = client.get(path, params=params, headers={"Accept-Encoding": "identity"})
+                response.raise_for_status()
+                bodies.append((label(path, params), response.content))
+                problems += check_served(client, path, params, response.content)
+
+    print(f"encoders: {', '.join(COMPRESSORS)}; threshold {MINIMUM_SIZE} bytes; link {args.link_mbps:g} Mbit/s")
+    print(f"{'body':<34} {'bytes':>7}  {'enc':<4} {'out':>6}  {'saved':>6}  {'cpu':>8}  {'cpu/KB saved':>12}  {'wire saved':>10}")
+    for name, body in bodies:
+        if len(body) < MINIMUM_SIZE:
+            name += " *"
+        for encoding, compress in COMPRESSORS.items():
+            saved = len(body) - len(compress(body))
+            cpu_ms = seconds_per_call(lambda: compress(body)) * 1000
+            wire_ms = saved * 8 / (args.link_mbps * 1000)
+            per_kb = f"{cpu_ms / (saved / 1024):.3f} ms" if saved > 0 else "-"
+            print(
+                f"{name:<34} {len(body):>7}  {encoding:<4} {len(body) - saved:>6}  {saved / len(body):>6.0%}"
+                f"  {cpu_ms:>5.3f} ms  {per_kb:>12}  {wire_ms:>7.2f} ms"
+            )
+
+    print("* under the threshold: sent uncompressed, shown for comparison")
+
+    largest = max((body for _, body in bodies), key=len)
+    cache = CompressedBodyCache()
+    for encoding, compress in COMPRESSORS.items():
+        cache.put(largest, encoding, compress(largest))
+        hit_ms = seconds_per_call(lambda: cache.get(largest, encoding)) * 1000
+        print(f"cache hit for the {len(largest)}-byte body ({encoding}): {hit_ms:.4f} ms")
+
+    for problem in problems:
+        print(f"MISMATCH {problem}")
+    return 0 if not problems else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,112 @@
+"""Load test: SQL rate as the number of polling kitchen / pickup screens grows.
+
+Starts the server (uvicorn) on a temporary database seeded with orders, then
+for each screen count in --screens runs a DURATION-second step in which:
+- that many screens each poll /orders?status=NEW, /orders/stats and /menu once
+  a second with a random phase, each from its own address (X-Forwarded-For,
+  trusted from localhost);
+- one till creates an order every 0.5 s and moves an older one to AWAITING,
+  so the cached reads keep being invalidated.
+
+For each step it prints the SQL statements per second (counted on the
+server's engine), the poll rate, latency percentiles, non-200 responses and
+how the read cache served the polls (GET /admin/read-cache). With the read
+cache the SQL rate should stay about flat as screens are added. Exits
+non-zero if any poll was not answered with 200.
+
+    python benchmarks/read_cache_load.py [--screens 1 5 10 20 40] [--duration 15] [--ttl 1]
+"""
+
+import argparse
+import asyncio
+import random
+import sys
+import time
+
+import httpx
+
+from common import percentiles, running_server, seed_database, statement_count, temporary_workdir
+
+POLLED = [("/orders", {"status": "NEW"}), ("/orders/stats", {}), ("/menu", {})]
+
+
+async def run_screen(client: httpx.AsyncClient, i: int, stop_at: float, latencies: list, codes: dict) -> None:
+    headers = {"X-Forwarded-For": f"10.0.{i // 250}.{i % 250 + 1}"}
+    await asyncio.sleep(random.random())  # screens poll with a random phase
+    while time.time() < stop_at:
+        started = time.perf_counter()
+        for path, params in POLLED:
+            start = time.perf_counter()
+            response = await client.get(path, params=params, headers=headers)
+            latencies.append((time.perf_counter() - start) * 1000)
+            codes[response.status_code] = codes.get(response.status_code, 0) + 1
+        await asyncio.sleep(max(0.0, 1 - (time.perf_counter() - started)))
+
+
+async def run_till(client: httpx.AsyncClient, stop_at: float) -> None:
+    n = 0
+    while time.time() < stop_at:
+        created = await client.post(
+            "/orders", json={"customer_name": f"Till {n}", "items": [{"menu_item_id": 1 + n % 5, "quantity": 1}]}
+        )
+        if created.status_code != 201:
+            raise RuntimeError(f"order create failed: {created.status_code}")
+        if n >= 20:
+            await client.post(f"/orders/{created.json()['id'] - 20}/await")
+        n += 1
+        await asyncio.sleep(0.5)
+
+
+async def run_step(base_url: str, duration: float, screens: int) -> dict:
+    latencies: list = []
+    codes: dict = {}
+    limits = httpx.Limits(max_connections=screens + 10)
+    async with httpx.AsyncClient(base_url=base_url, timeout=60, limits=limits) as client:
+        cache_before = (await client.get("/admin/read-cache")).json()
+        statements_before = statement_count(base_url)
+        stop_at = time.time() + duration
+        await asyncio.gather(
+            run_till(client, stop_at),
+            *(run_screen(client, i, stop_at, latencies, codes) for i in range(screens)),
+        )
+        statements = statement_count(base_url) - statements_before
+        cache_after = (await client.get("/admin/read-cache")).json()
+    return {
+        "screens": screens,
+        "sql_per_s": statements / duration,
+        "polls_per_s": len(latencies) / duration,
+        "latency": percentiles(latencies),
+        "failed": sum(count for code, count in codes.items() if code != 200),
+        "cache": {name: cache_after[name] - cache_before[name] for name in ("loads", "coalesced", "hits")},
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--screens", type=int, nargs="+", default=[1, 5, 10, 20, 40])
+    parser.add_argument("--duration", type=float, default=15.0, help="seconds per step")
+    parser.add_argument("--orders", type=int, default=300, help="orders to seed, 15%% of them NEW")
+    parser.add_argument("--port", type=int, default=8191)
+    parser.add_argument("--ttl", type=float, default=1.0, help="READ_CACHE_TTL_SECONDS for the server")
+    args = parser.parse_args()
+
+    print(f"{'screens':>7}  {'sql/s':>6}  {'polls/s':>7}  {'p50':>8}  {'p99':>8}  {'non-200':>7}  loads / coalesced / hits")
+    failed = 0
+    with temporary_workdir("read-cache-load-") as workdir:
+        seed_database(workdir, args.orders, new_fraction=0.15, menu_items=5)
+        with running_server(workdir, args.port, READ_CACHE_TTL_SECONDS=str(args.ttl)) as base_url:
+            for screens in args.screens:
+                step = asyncio.run(run_step(base_url, args.duration, screens))
+                cache, latency = step["cache"], step["latency"]
+                print(
+                    f"{screens:>7}  {step['sql_per_s']:>6.0f}  {step['polls_per_s']:>7.0f}"
+                    f"  {latency['p50']:>5.1f} ms  {latency['p99']:>5.1f} ms  {step['failed']:>7}"
+                    f"  {cache['loads']} / {cache['coalesced']} / {cache['hits']}",
+                    flush=True,
+                )
+                failed += step["failed"]
+    return 0 if failed == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
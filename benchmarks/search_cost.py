@@ -0,0 +1,205 @@
+"""Benchmark: order search at 100k orders, and what the search index costs writes.
+
+Starts the server (uvicorn) on a temporary database seeded with ORDERS
+2-item orders, with the read cache off (READ_CACHE_TTL_SECONDS=0) so every
+request runs its query, and then:
+- times GET /orders/search for broad, narrow, filtered and empty searches;
+- times the same searches in SQL, through the orders_fts index and as a
+  LIKE scan of orders and order_items (what searching without it costs),
+  and downloading every order once, which is what clients did before;
+- with the server stopped, times creating a 2-item order in SQL (the same
+  statements as POST /orders) with the orders_fts triggers and without them,
+  in alternating rounds.
+
+Exits non-zero if p95 of any search exceeds --target-p95-ms.
+
+    python benchmarks/search_cost.py [--orders 100000] [--requests 30] [--target-p95-ms 50]
+"""
+
+import argparse
+import os
+import sqlite3
+import statistics
+import sys
+import time
+from datetime import datetime
+from typing import Callable, List, Optional
+
+import httpx
+
+from common import percentiles, running_server, seed_database, temporary_workdir
+
+# (label, q, status, limit); seeded orders are all COMPLETED except the newest 1%
+SEARCHES = [
+    ("one-letter prefix", "w", None, 50),
+    ("customer name", "wang", None, 50),
+    ("two prefixes", "wa ch", None, 50),
+    ("name, limit 200", "wang", None, 200),
+    ("item, status NEW", "fried", "NEW", 50),
+    ("item, no order CANCELED", "fried", "CANCELED", 50),
+    ("unique name", "quimby", None, 50),
+    ("no match", "zzz", None, 50),
+]
+
+
+
+def fts_sql(status: Optional[str]) -> str:
+    # The query GET /orders/search runs
+    status_filter = " AND o.status = :status" if status else ""
+    return (
+        "SELECT o.id FROM orders_fts JOIN orders o ON o.id = orders_fts.rowid WHERE orders_fts MATCH :match"
+        f"{status_filter} ORDER BY orders_fts.rowid DESC LIMIT :limit"
+    )
+
+
+def like_sql(status: Optional[str]) -> str:
+    status_filter = " AND o.status = :status" if status else ""
+    return (
+        "SELECT o.id FROM orders o WHERE (o.customer_name LIKE :pattern OR EXISTS"
+        " (SELECT 1 FROM order_items oi WHERE oi.order_id = o.id AND oi.item_name LIKE :pattern))"
+        f"{status_filter} ORDER BY o.id DESC LIMIT :limit"
+    )
+
+
+def time_ms(function: Callable[[], object]) -> float:
+    started = time.perf_counter()
+    function()
+    return (time.perf_counter() - started) * 1000
+
+
+def match_for(q: str) -> str:
+    # Same expression as app.utils.search.build_prefix_match_query
+    return " ".join(f'"{term}"*' for term in q.split())
+
+
+def like_for(q: str) -> str:
+    # A LIKE can only look for one substring; use the first term
+    return f"%{q.split()[0]}%"
+
+
+def run_searches(base_url: str, requests: int) -> List[dict]:
+    results = []
+    with httpx.Client(base_url=base_url, timeout=60) as client:
+        created = client.post("/orders", json={"customer_name": "Zed Quimby", "items": [{"menu_item_id": 1, "quantity": 1}]})
+        if created.status_code != 201:
+            raise RuntimeError(f"order create failed: {created.status_code}")
+        for name, q, status, limit in SEARCHES:
+            params = {"q": q, "limit": limit, **({"status": status} if status else {})}
+            latencies, count = [], 0
+            for _ in range(requests):
+                started = time.perf_counter()
+                response = client.get("/orders/search", params=params)
+                latencies.append((time.perf_counter() - started) * 1000)
+                response.raise_for_status()
+                count = len(response.json())
+            results.append({"name": name, "q": q, "status": status, "limit": limit, "count": count, **percentiles(latencies)})
+
+        started = time.perf_counter()
+        everything = client.get("/orders")
+        download_ms = (time.perf_counter() - started) * 1000
+        everything.raise_for_status()
+    print(f"before: downloading all orders to filter on the client: {download_ms:.0f} ms, {len(everything.content) / 1e6:.1f} MB")
+    return results
+
+
+def compare_in_sql(database: str, results: List[dict]) -> None:
+    conn = sqlite3.connect(database)
+    try:
+        for result in results:
+            status, params = result["status"], {"status": result["status"], "limit": result["limit"]}
+            fts_params = {"match": match_for(result["q"]), **params}
+            like_params = {"pattern": like_for(result["q"]), **params}
+            fts = [time_ms(lambda: conn.execute(fts_sql(status), fts_params).fetchall()) for _ in range(5)]
+            like = [time_ms(lambda: conn.execute(like_sql(status), like_params).fetchall()) for _ in range(5)]
+            result["fts_ms"], result["like_ms"] = statistics.median(fts), statistics.median(like)
+    finally:
+        conn.close()
+
+
+def create_order(conn: sqlite3.Connection, n: int) -> tuple:
+    """Create a 2-item order like POST /orders; returns (statements ms, commit ms)."""
+
+    now = datetime.utcnow().isoformat(" ")
+    started = time.perf_counter()
+    conn.execute("BEGIN")
+    order_id = conn.execute(
+        "INSERT INTO orders (customer_name, status, preorder, total_price_cents, created_at, updated_at)"
+        " VALUES (?, 'NEW', 0, 0, ?, ?)",
+        (f"Bench Customer {n}", now, now),
+    ).lastrowid
+    for menu_item_id, item_name in ((1, "Fried Chicken 1"), (2, "Bubble Tea 1")):
+        conn.execute(
+            "INSERT INTO order_items (order_id, menu_item_id, item_name, unit_price_cents, quantity, line_total_cents)"
+            " VALUES (?, ?, ?, 3000, 1, 3000)",
+            (order_id, menu_item_id, item_name),
+        )
+    conn.execute(
+        "UPDATE orders SET total_price_cents = 6000, order_code = ?, updated_at = ? WHERE id = ?",
+        (f"BENCH-{order_id}", now, order_id),
+    )
+    statements = time.perf_counter()
+    conn.execute("COMMIT")
+    return (statements - started) * 1000, (time.perf_counter() - statements) * 1000
+
+
+def measure_trigger_overhead(database: str, rounds: int = 6, orders_per_round: int = 50) -> dict:
+    conn = sqlite3.connect(database, isolation_level=None)
+    try:
+        triggers = conn.execute("SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'orders_fts_%'").fetchall()
+        timings: dict = {True: [], False: []}
+        n = 0
+        for round_number in range(rounds):
+            with_triggers = round_number % 2 == 0
+            if not with_triggers:
+                for name, _ in triggers:
+                    conn.execute(f"DROP TRIGGER {name}")
+            for _ in range(orders_per_round):
+                timings[with_triggers].append(create_order(conn, n))
+                n += 1
+            if not with_triggers:
+                for _, sql in triggers:
+                    conn.execute(sql)
+    finally:
+        conn.close()
+    return {
+        with_triggers: (statistics.median(s for s, _ in rows), statistics.median(s + c for s, c in rows))
+        for with_triggers, rows in timings.items()
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--orders", type=int, default=100000)
+    parser.add_argument("--requests", type=int, default=30, help="requests per search")
+    parser.add_argument("--port", type=int, default=8194)
+    parser.add_argument("--target-p95-ms", type=float, default=50.0)
+    args = parser.parse_args()
+
+    with temporary_workdir("search-cost-") as workdir:
+        seed_database(workdir, args.orders, new_fraction=0.01)
+        database = os.path.join(workdir, "database.db")
+        with running_server(workdir, args.port, READ_CACHE_TTL_SECONDS="0") as base_url:
+            results = run_searches(base_url, args.requests)
+        compare_in_sql(database, results)
+        overhead = measure_trigger_overhead(database)
+
+    print(f"{'search':<24} {'q':<7} {'found':>5}  {'http p50':>9}  {'http p95':>9}  {'fts sql':>9}  {'LIKE scan':>9}")
+    for r in results:
+        print(
+            f"{r['name']:<24} {r['q']:<7} {r['count']:>5}  {r['p50']:>6.1f} ms  {r['p95']:>6.1f} ms"
+            f"  {r['fts_ms']:>6.1f} ms  {r['like_ms']:>6.1f} ms"
+        )
+    (fts_statements, fts_total), (plain_statements, plain_total) = overhead[True], overhead[False]
+    print(
+        f"2-item order create, median: statements {fts_statements:.2f} ms with the search triggers,"
+        f" {plain_statements:.2f} ms without (+{fts_statements - plain_statements:.2f} ms);"
+        f" with commit {fts_total:.2f} ms vs {plain_total:.2f} ms"
+    )
+
+    met = max(r["p95"] for r in results) <= args.target_p95_ms
+    print(f"target search p95 <= {args.target_p95_ms:.0f} ms: {'met' if met else 'MISSED'}")
+    return 0 if met else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,108 @@
+"""Benchmark: stats and report generation before and after integer-cents money.
+
+Extracts the app at --before-ref (the last commit storing money as
+Numeric(10, 2) and summing Decimal objects in Python) with git archive, seeds
+a temporary database with ORDERS 2-item orders through it and times
+GET /orders/stats and GET /reports/orders.xlsx, median of --repeats. Then
+starts the current app on the same database, which converts it to integer
+cents on startup, and times the same requests with the read cache off.
+The current app also has later changes (e.g. reports are built in a worker
+process), so this compares the two versions, not the money change alone.
+
+Prints both medians and the current app's startup time including the
+conversion, and exits non-zero if the two versions disagree on the stats.
+Reports are rate limited per client, so waits out 429s between requests
+(they are not timed).
+
+    python benchmarks/stats_report_cost.py [--orders 20000] [--repeats 5]
+"""
+
+import argparse
+import io
+import statistics
+import subprocess
+import sys
+import tarfile
+import tempfile
+import time
+from decimal import Decimal
+from typing import Dict, Tuple
+
+import httpx
+
+from common import ROOT, running_server, seed_database, temporary_workdir
+
+TIMED = ["/orders/stats", "/reports/orders.xlsx"]
+
+
+def extract_app(ref: str, directory: str) -> None:
+    archive = subprocess.run(["git", "-C", ROOT, "archive", ref, "app"], stdout=subprocess.PIPE, check=True).stdout
+    with tarfile.open(fileobj=io.BytesIO(archive)) as tar:
+        tar.extractall(directory, filter="data")
+
+
+def median_ms(client: httpx.Client, path: str, repeats: int) -> Tuple[float, httpx.Response]:
+    timings = []
+    while len(timings) < repeats:
+        started = time.perf_counter()
+        response = client.get(path)
+        elapsed = (time.perf_counter() - started) * 1000
+        if response.status_code == 429:
+            time.sleep(float(response.headers["Retry-After"]))
+            continue
+        response.raise_for_status()
+        timings.append(elapsed)
+    return statistics.median(timings), response
+
+
+def measure(base_url: str, repeats: int) -> Tuple[Dict[str, float], dict]:
+    timings = {}
+    with httpx.Client(base_url=base_url, timeout=300) as client:
+        for path in TIMED:
+            timings[path], response = median_ms(client, path, repeats)
+            if path == "/orders/stats":
+                stats = response.json()
+    return timings, stats
+
+
+def comparable(stats: dict) -> tuple:
+    items = {item["item_name"]: (item["total_quantity"], Decimal(str(item["total_amount"]))) for item in stats["items"]}
+    return stats["total_orders"], Decimal(str(stats["total_amount"])), items
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--orders", type=int, default=20000)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--port", type=int, default=8195)
+    parser.add_argument(
+        "--before-ref", default="e8a3b6d^", help="commit of the app to compare with (the last one with Numeric money)"
+    )
+    args = parser.parse_args()
+
+    with temporary_workdir("stats-report-cost-") as workdir, tempfile.TemporaryDirectory(prefix="before-") as before:
+        extract_app(args.before_ref, before)
+        seed_database(workdir, args.orders, root=before, money_in_cents=False)
+        with running_server(workdir, args.port, root=before) as base_url:
+            before_ms, before_stats = measure(base_url, args.repeats)
+
+        started = time.perf_counter()
+        with running_server(workdir, args.port, READ_CACHE_TTL_SECONDS="0") as base_url:
+            startup_s = time.perf_counter() - started
+            after_ms, after_stats = measure(base_url, args.repeats)
+
+    print(f"{args.orders} orders, median of {args.repeats}; before = {args.before_ref}")
+    print(f"{'request':<22} {'before':>10}  {'after':>10}  {'speedup':>7}")
+    for path in TIMED:
+        print(f"{path:<22} {before_ms[path]:>7.0f} ms  {after_ms[path]:>7.0f} ms  {before_ms[path] / after_ms[path]:>6.1f}x")
+    print(f"current app startup, including the conversion to integer cents: {startup_s:.1f} s")
+
+    same = comparable(before_stats) == comparable(after_stats)
+    print(f"stats before and after: {'identical' if same else 'DIFFERENT'}")
+    if not same:
+        print(f"before: {before_stats}\nafter:  {after_stats}")
+    return 0 if same else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())